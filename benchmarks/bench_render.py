@@ -0,0 +1,168 @@
+"""Бенчмарк рендера расписаний ImageProcessor
+
+Генерирует синтетические DOCX и XML заданных размеров и измеряет
+docx_to_image, xml_to_image, calculate_table_width, draw_compact_table и
+кодирование изображения. Для каждого замера записываются время (минимум и
+медиана по повторам), пиковый RSS процесса и пик выделений Python по
+tracemalloc. Пиксельные буферы Pillow выделяются вне интерпретатора и видны
+только в RSS. Каждый замер выполняется в отдельном процессе, чтобы пиковый
+RSS не накапливался между замерами.
+
+Запуск: python benchmarks/bench_render.py [--preset small medium large]
+        [--repeat N] [--output results.json] [--compare baseline.json]
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import resource
+import statistics
+import subprocess
+import tempfile
+import tracemalloc
+import multiprocessing
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from schedule_generator import generate_docx, generate_xml
+
+PRESETS = {
+    'small': {'rows': 20, 'cols': 6, 'merges': 2, 'words': 4},
+    'medium': {'rows': 150, 'cols': 10, 'merges': 10, 'words': 6},
+    'large': {'rows': 600, 'cols': 12, 'merges': 30, 'words': 8},
+}
+
+CASES = (
+    'docx_to_image',
+    'xml_to_image',
+    'calculate_table_width',
+    'draw_compact_table',
+    'encode_jpeg',
+    'encode_adaptive',
+)
+
+def prepare_case(case, docx_path, xml_path, color_mode):
+    """Подготовка вызываемой функции замера вне измеряемого участка"""
+    from PIL import Image, ImageDraw
+    from image_processor import ImageProcessor
+
+    processor = ImageProcessor(color_mode=color_mode)
+    if case == 'docx_to_image':
+        return lambda: processor.docx_to_image(docx_path)
+    if case == 'xml_to_image':
+        return lambda: processor.xml_to_image(xml_path)
+
+    table_data = processor.extract_xml_tables(xml_path)[0]
+    font = processor.FONT_SMALL
+    if case == 'calculate_table_width':
+        return lambda: processor.calculate_table_width(table_data, font)
+    if case == 'draw_compact_table':
+        col_widths = processor.compact_column_widths(table_data, font)
+        img = Image.new(color_mode, (sum(col_widths) + 21, len(table_data) * 22 + 21), color='white')
+        draw = ImageDraw.Draw(img)
+        return lambda: processor.draw_compact_table(draw, table_data, 10, 10, font, col_widths=col_widths)
+
+    img = processor.docx_to_image(docx_path)
+    if case == 'encode_jpeg':
+        return lambda: processor.encode_image(img)
+    if case == 'encode_adaptive':
+        return lambda: processor.encode_page(img)
+    raise ValueError(f"Неизвестный замер: {case}")
+
+def run_case(case, docx_path, xml_path, color_mode, repeat):
+    """Замер одной операции, выполняется в дочернем процессе"""
+    func = prepare_case(case, docx_path, xml_path, color_mode)
+    func()
+    setup_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    func()
+    alloc_current, alloc_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'wall_min': min(timings),
+        'wall_median': statistics.median(timings),
+        'setup_rss_kb': setup_rss,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'alloc_peak_bytes': alloc_peak,
+        'alloc_retained_bytes': alloc_current,
+    }
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def run(presets, repeat, color_mode, cases=CASES):
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        for preset in presets:
+            params = PRESETS[preset]
+            docx_path = generate_docx(os.path.join(work_dir, f'{preset}.docx'), **params)
+            xml_path = generate_xml(os.path.join(work_dir, f'{preset}.xml'), params['rows'],
+                                    params['cols'], params['words'])
+            for case in cases:
+                with context.Pool(1) as pool:
+                    result = pool.apply(run_case, (case, docx_path, xml_path, color_mode, repeat))
+                results[f'{preset}/{case}'] = result
+                print(f"{preset + '/' + case:<32} {result['wall_min'] * 1000:9.1f} мс "
+                      f"{result['peak_rss_kb'] / 1024:8.1f} МБ RSS "
+                      f"{result['alloc_peak_bytes'] / 1024:9.1f} КБ alloc")
+
+    return {
+        'meta': {
+            'revision': git_revision(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'color_mode': color_mode,
+            'presets': {preset: PRESETS[preset] for preset in presets},
+        },
+        'results': results,
+    }
+
+def compare(current, baseline_path):
+    """Сравнение с сохраненными результатами, отношение текущего к базовому"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    print(f"\nСравнение с {baseline['meta'].get('revision') or baseline_path}:")
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        ratios = [result[key] / base[key] if base[key] else float('nan')
+                  for key in ('wall_min', 'peak_rss_kb', 'alloc_peak_bytes')]
+        print(f"{name:<32} время {ratios[0]:6.2f}x  RSS {ratios[1]:6.2f}x  alloc {ratios[2]:6.2f}x")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--preset', nargs='+', choices=sorted(PRESETS), default=['small', 'medium'])
+    parser.add_argument('--case', nargs='+', choices=CASES, default=list(CASES))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--color-mode', default='RGB', choices=('RGB', 'L', '1'))
+    parser.add_argument('--output', help='файл для сохранения результатов в JSON')
+    parser.add_argument('--compare', help='JSON с результатами предыдущего запуска')
+    args = parser.parse_args()
+
+    current = run(args.preset, args.repeat, args.color_mode, args.case)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        compare(current, args.compare)
@@ -0,0 +1,76 @@
+"""Микробенчмарк фильтрации абзацев расписания
+
+Сравнивает стоимость обработки одного абзаца прежним способом (14 отдельных
+re.search и повторное определение функции обработки времени) и общим
+конвейером text_filters.
+
+Запуск: python benchmarks/bench_text_filters.py [--number N]
+"""
+import os
+import re
+import sys
+import timeit
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from text_filters import DEFAULT_SKIP_PATTERNS, text_filter
+
+SAMPLE_PARAGRAPHS = [
+    'УТВЕРЖДАЮ',
+    'Заместитель директора по учебной работе',
+    '«12» сентября 2024 года',
+    'Понедельник 1 неделя',
+    'Расписание занятий на 12.05 с 08:30 09:15 09:20 10:05 10:15 11:00 до 15:40',
+    'Группа ИС-21 Информационные системы и программирование',
+    'Обед 12:00-12:40',
+    'Классный час в актовом зале',
+    '',
+    'Диспетчер __________________Миронова Е.В',
+]
+
+def legacy_filter(text):
+    """Прежняя обработка абзаца из docx_to_image"""
+    skip_patterns = list(DEFAULT_SKIP_PATTERNS)
+
+    def process_time_in_text(text):
+        time_pattern = r'\b\d{1,2}[:.\-]\d{2}\b'
+        time_matches = re.findall(time_pattern, text)
+
+        if len(time_matches) > 2:
+            first_time = time_matches[0]
+            last_time = time_matches[-1]
+
+            def replace_time(match):
+                time_str = match.group()
+                if time_str == first_time or time_str == last_time:
+                    return time_str
+                return ""
+
+            processed_text = re.sub(time_pattern, replace_time, text)
+            processed_text = re.sub(r'\s+', ' ', processed_text).strip()
+            return processed_text
+        return text
+
+    text = text.strip()
+    if text and not any(re.search(pattern, text, re.IGNORECASE) for pattern in skip_patterns):
+        return process_time_in_text(text)
+    return None
+
+def run(number):
+    for paragraph in SAMPLE_PARAGRAPHS:
+        assert legacy_filter(paragraph) == text_filter.filter_paragraph(paragraph), paragraph
+
+    results = {}
+    for name, func in (('legacy', legacy_filter), ('pipeline', text_filter.filter_paragraph)):
+        seconds = min(timeit.repeat(lambda: [func(p) for p in SAMPLE_PARAGRAPHS], number=number, repeat=5))
+        results[name] = seconds / (number * len(SAMPLE_PARAGRAPHS)) * 1e9
+
+    for name, ns in results.items():
+        print(f"{name:>10}: {ns:8.0f} нс на абзац")
+    print(f"{'ускорение':>10}: {results['legacy'] / results['pipeline']:8.1f}x")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--number', type=int, default=2000)
+    run(parser.parse_args().number)
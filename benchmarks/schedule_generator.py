@@ -0,0 +1,96 @@
+"""Генератор синтетических файлов расписания DOCX и XML
+
+Размер задается числом строк и колонок таблицы, количеством объединенных
+ячеек и числом слов в ячейке. Один и тот же seed дает одинаковые файлы,
+поэтому результаты бенчмарков можно сравнивать между коммитами.
+
+Запуск: python benchmarks/schedule_generator.py OUT_DIR [--rows N] [--cols N] [--merges N] [--words N]
+"""
+import os
+import random
+import argparse
+from xml.sax.saxutils import escape
+from docx import Document
+
+WORDS = [
+    'Математика', 'Физика', 'Информатика', 'Литература', 'История', 'Химия',
+    'Обществознание', 'Иностранный', 'язык', 'Физическая', 'культура',
+    'Иванов', 'И.И.', 'Петрова', 'А.А.', 'Сидоров', 'В.П.', 'Кузнецова', 'Е.Н.',
+    'ауд.', '101', '205', '312', 'лаб.3', 'спортзал', 'лекция', 'практика',
+]
+DAYS = ['Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница', 'Суббота']
+PAIR_TIMES = ['08:30-10:05', '10:15-11:50', '12:30-14:05', '14:15-15:50', '16:00-17:35']
+
+def cell_text(rng, words):
+    """Случайный текст ячейки длиной до words слов"""
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(0, words)))
+
+def generate_rows(rows, cols, words, seed=1):
+    """Строки таблицы расписания: заголовок и строки пар по дням"""
+    rng = random.Random(seed)
+    header = ['День', '№', 'Время'] + [f'ИС-{21 + i}' for i in range(max(cols - 3, 0))]
+    table = [header[:cols]]
+    for row in range(rows - 1):
+        pair = row % len(PAIR_TIMES)
+        fixed = [DAYS[row // len(PAIR_TIMES) % len(DAYS)], str(pair + 1), PAIR_TIMES[pair]]
+        table.append((fixed + [cell_text(rng, words) for _ in range(max(cols - 3, 0))])[:cols])
+    return table
+
+def generate_docx(path, rows=30, cols=8, merges=4, words=6, seed=1):
+    """Синтетический DOCX расписания с шапкой и одной таблицей"""
+    rng = random.Random(seed)
+    table_rows = generate_rows(rows, cols, words, seed)
+
+    document = Document()
+    document.add_paragraph('УТВЕРЖДАЮ Заместитель директора')
+    document.add_paragraph('Расписание занятий на 12.05 с 08:30 09:15 09:20 10:05 до 15:40')
+    document.add_paragraph('Понедельник 1 неделя')
+
+    table = document.add_table(rows=len(table_rows), cols=cols)
+    for row, values in zip(table.rows, table_rows):
+        for cell, value in zip(row.cells, values):
+            cell.text = value
+
+    merged = set()
+    attempts = 0
+    while len(merged) < merges * 2 and attempts < merges * 10 and rows >= 3 and cols >= 2:
+        attempts += 1
+        row = rng.randint(1, rows - 2)
+        col = rng.randint(0, cols - 2)
+        other = (row, col + 1) if rng.random() < 0.5 else (row + 1, col)
+        # Пересекающиеся объединения дают непрямоугольную область
+        if (row, col) in merged or other in merged:
+            continue
+        table.cell(row, col).merge(table.cell(*other))
+        merged.update(((row, col), other))
+
+    document.add_paragraph('Диспетчер __________________Миронова Е.В')
+    document.save(path)
+    return path
+
+def generate_xml(path, rows=30, cols=8, words=6, seed=1):
+    """Синтетический XML расписания из одной таблицы"""
+    table_rows = generate_rows(rows, cols, words, seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="utf-8"?>\n<schedule><table>\n')
+        for values in table_rows:
+            f.write('<row>' + ''.join(f'<cell>{escape(value)}</cell>' for value in values) + '</row>\n')
+        f.write('</table></schedule>\n')
+    return path
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('out_dir')
+    parser.add_argument('--rows', type=int, default=30)
+    parser.add_argument('--cols', type=int, default=8)
+    parser.add_argument('--merges', type=int, default=4)
+    parser.add_argument('--words', type=int, default=6)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    name = f'schedule_{args.rows}x{args.cols}'
+    print(generate_docx(os.path.join(args.out_dir, name + '.docx'),
+                        args.rows, args.cols, args.merges, args.words, args.seed))
+    print(generate_xml(os.path.join(args.out_dir, name + '.xml'),
+                       args.rows, args.cols, args.words, args.seed))
@@ -1,13 +1,32 @@
+import os
+import re
+import json
 import sqlite3
 import hashlib
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+HASH_BUFFER_SIZE = 1024 * 1024
+HASH_WORKERS = 4
+
+def content_hasher():
+    """Хэш содержимого файлов расписания, общий для базы и хранилища"""
+    return hashlib.blake2b(digest_size=16)
+
+def hash_file(file_path):
+    hasher = content_hasher()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_BUFFER_SIZE), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
 class DatabaseManager:
-    def __init__(self, db_name='bot_users.db'):
+    def __init__(self, db_name='bot_users.db', hash_workers=HASH_WORKERS):
         self.db_name = db_name
+        self.hash_workers = hash_workers
         self.init_db()
     
     def init_db(self):
@@ -22,6 +41,9 @@ class DatabaseManager:
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
+        cursor.execute("PRAGMA table_info(users)")
+        if 'study_group' not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute('ALTER TABLE users ADD COLUMN study_group TEXT')
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS schedule_files (
                 filename TEXT PRIMARY KEY,
@@ -30,6 +52,116 @@ class DatabaseManager:
                 last_modified TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
+        cursor.execute("PRAGMA table_info(telegram_files)")
+        columns = [row[1] for row in cursor.fetchall()]
+        if columns and 'page' not in columns:
+            # Таблица только кэширует file_id, поэтому старый формат просто пересоздается
+            cursor.execute('DROP TABLE telegram_files')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS telegram_files (
+                file_hash TEXT,
+                variant TEXT,
+                page INTEGER DEFAULT 0,
+                pages INTEGER DEFAULT 1,
+                file_id TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (file_hash, variant, page)
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS encoding_stats (
+                file_hash TEXT,
+                variant TEXT,
+                page INTEGER DEFAULT 0,
+                format TEXT,
+                size INTEGER,
+                jpeg_size INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (file_hash, variant, page)
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS schedule_sources (
+                filename TEXT,
+                building INTEGER,
+                file_hash TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (building, filename)
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS schedule_parsed (
+                file_hash TEXT PRIMARY KEY,
+                entries INTEGER DEFAULT 0,
+                parsed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute("PRAGMA table_info(schedule_parsed)")
+        if 'parser_version' not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute('ALTER TABLE schedule_parsed ADD COLUMN parser_version TEXT')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS schedule_entries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                file_hash TEXT,
+                group_name TEXT,
+                day_index INTEGER,
+                lesson_date TEXT,
+                pair_number INTEGER,
+                time TEXT,
+                subject TEXT,
+                teacher TEXT,
+                room TEXT,
+                raw_text TEXT,
+                table_index INTEGER,
+                row_index INTEGER,
+                col_index INTEGER
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS schedule_tables (
+                file_hash TEXT PRIMARY KEY,
+                tables_json TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute("SELECT name FROM sqlite_master WHERE name = 'schedule_cells'")
+        if cursor.fetchone() is None:
+            # Индекс ячеек заполняется при разборе, поэтому файлы разбираются заново
+            cursor.execute('DELETE FROM schedule_parsed')
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS schedule_cells USING fts5 (
+                text,
+                header UNINDEXED,
+                row_label UNINDEXED,
+                file_hash UNINDEXED,
+                table_index UNINDEXED,
+                row_index UNINDEXED,
+                col_index UNINDEXED,
+                tokenize = 'unicode61 remove_diacritics 0'
+            )
+        ''')
+        cursor.execute('PRAGMA table_info(file_fingerprints)')
+        fingerprint_columns = [row[1] for row in cursor.fetchall()]
+        if fingerprint_columns and 'device' not in fingerprint_columns:
+            # Без устройства inode не однозначен, отпечатки собираются заново
+            cursor.execute('DROP TABLE file_fingerprints')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS file_fingerprints (
+                path TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime_ns INTEGER,
+                device INTEGER,
+                inode INTEGER,
+                file_hash TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_file_fingerprints_inode ON file_fingerprints (device, inode, size, mtime_ns)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_schedule_entries_file ON schedule_entries (file_hash)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_schedule_entries_group ON schedule_entries (group_name, day_index, pair_number)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_schedule_entries_date ON schedule_entries (lesson_date)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_schedule_entries_teacher ON schedule_entries (teacher)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_schedule_sources_hash ON schedule_sources (file_hash)')
         conn.commit()
         conn.close()
     
@@ -38,8 +170,11 @@ class DatabaseManager:
         conn = sqlite3.connect(self.db_name)
         cursor = conn.cursor()
         try:
-            cursor.execute('INSERT OR REPLACE INTO users (chat_id, is_group, building) VALUES (?, ?, ?)', 
-                          (chat_id, is_group, building))
+            # Обновление без замены строки, чтобы не терять выбранную группу
+            cursor.execute('''
+                INSERT INTO users (chat_id, is_group, building) VALUES (?, ?, ?)
+                ON CONFLICT(chat_id) DO UPDATE SET is_group = excluded.is_group, building = excluded.building
+            ''', (chat_id, is_group, building))
             conn.commit()
         except Exception as e:
             logger.error(f"Ошибка добавления пользователя: {e}")
@@ -92,18 +227,161 @@ class DatabaseManager:
         conn.close()
         return users
     
+    def get_user_group(self, chat_id):
+        """Получение учебной группы пользователя"""
+        conn = sqlite3.connect(self.db_name)
+        cursor = conn.cursor()
+        try:
+            cursor.execute('SELECT study_group FROM users WHERE chat_id = ?', (chat_id,))
+            result = cursor.fetchone()
+            return result[0] if result else None
+        except Exception as e:
+            logger.error(f"Ошибка получения группы пользователя: {e}")
+            return None
+        finally:
+            conn.close()
+    
+    def set_user_group(self, chat_id, study_group):
+        """Установка учебной группы пользователя, None сбрасывает группу"""
+        conn = sqlite3.connect(self.db_name)
+        cursor = conn.cursor()
+        try:
+            cursor.execute('UPDATE users SET study_group = ? WHERE chat_id = ?', (study_group, chat_id))
+            conn.commit()
+            return cursor.rowcount > 0
+        except Exception as e:
+            logger.error(f"Ошибка установки группы пользователя: {e}")
+            return False
+        finally:
+            conn.close()
+    
+    def get_user_groups(self, building=None):
+        """Учебные группы пользователей, у которых они выбраны"""
+        conn = sqlite3.connect(self.db_name)
+        cursor = conn.cursor()
+        try:
+            if building is not None:
+                cursor.execute('SELECT chat_id, study_group FROM users WHERE study_group IS NOT NULL AND building = ?',
+                               (building,))
+            else:
+                cursor.execute('SELECT chat_id, study_group FROM users WHERE study_group IS NOT NULL')
+            return {row[0]: row[1] for row in cursor.fetchall()}
+        except Exception as e:
+            logger.error(f"Ошибка получения групп пользователей: {e}")
+            return {}
+        finally:
+            conn.close()
+    
     def get_file_hash(self, file_path):
         """Вычисление хэша файла"""
+        return self.get_file_hashes([file_path]).get(file_path)
+    
+    def get_file_hashes(self, file_paths):
+        """Хэши файлов по индексу отпечатков
+        
+        Файл читается, только если его размер, время изменения, устройство
+        или inode не совпадают с сохраненными. Совпадение по устройству и
+        inode находит тот же файл по другому пути, например жесткую ссылку
+        в новом поколении папки расписания. Несовпавшие файлы хэшируются параллельно.
+        """
+        stats = {}
+        for file_path in file_paths:
+            try:
+                stats[file_path] = os.stat(file_path)
+            except Exception as e:
+                logger.error(f"Ошибка вычисления хэша файла {file_path}: {e}")
+        if not stats:
+            return {}
+        
+        hashes = {}
+        conn = sqlite3.connect(self.db_name)
+        cursor = conn.cursor()
+        try:
+            for file_path, stat in stats.items():
+                cursor.execute('''
+                    SELECT file_hash FROM file_fingerprints
+                    WHERE size = ? AND mtime_ns = ? AND device = ? AND inode = ? AND (path = ? OR inode != 0)
+                    ORDER BY path = ? DESC LIMIT 1
+                ''', (stat.st_size, stat.st_mtime_ns, stat.st_dev, stat.st_ino, file_path, file_path))
+                row = cursor.fetchone()
+                if row:
+                    hashes[file_path] = row[0]
+        except Exception as e:
+            logger.error(f"Ошибка чтения отпечатков файлов: {e}")
+        finally:
+            conn.close()
+        
+        missing = [file_path for file_path in stats if file_path not in hashes]
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(self.hash_workers, len(missing))) as executor:
+                results = executor.map(self._hash_file, missing)
+                hashes.update((file_path, file_hash) for file_path, file_hash in zip(missing, results) if file_hash)
+        
+        self.save_file_fingerprints({file_path: (stats[file_path], hashes[file_path])
+                                     for file_path in stats if file_path in hashes})
+        return hashes
+    
+    @staticmethod
+    def _hash_file(file_path):
         try:
-            hasher = hashlib.md5()
-            with open(file_path, 'rb') as f:
-                for chunk in iter(lambda: f.read(4096), b''):
-                    hasher.update(chunk)
-            return hasher.hexdigest()
+            return hash_file(file_path)
         except Exception as e:
             logger.error(f"Ошибка вычисления хэша файла {file_path}: {e}")
             return None
     
+    def save_file_fingerprints(self, fingerprints):
+        """Сохранение отпечатков: путь -> (os.stat_result, хэш)"""
+        conn = sqlite3.connect(self.db_name)
+        cursor = conn.cursor()
+        try:
+            cursor.executemany('''
+                INSERT OR REPLACE INTO file_fingerprints (path, size, mtime_ns, device, inode, file_hash, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ''', [(file_path, stat.st_size, stat.st_mtime_ns, stat.st_dev, stat.st_ino, file_hash)
+                  for file_path, (stat, file_hash) in fingerprints.items()])
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Ошибка сохранения отпечатков файлов: {e}")
+        finally:
+            conn.close()
+    
+    def prune_file_fingerprints(self):
+        """Удаление отпечатков файлов, которых больше нет"""
+        conn = sqlite3.connect(self.db_name)
+        cursor = conn.cursor()
+        try:
+            cursor.execute('SELECT path FROM file_fingerprints')
+            stale = [(row[0],) for row in cursor.fetchall() if not os.path.exists(row[0])]
+            cursor.executemany('DELETE FROM file_fingerprints WHERE path = ?', stale)
+            conn.commit()
+            return len(stale)
+        except Exception as e:
+            logger.error(f"Ошибка очистки отпечатков файлов: {e}")
+            return 0
+        finally:
+            conn.close()
+    
+    def replace_file_hashes(self, mapping):
+        """Замена старых хэшей файлов новыми после смены алгоритма хэширования
+        
+        Переносятся известные файлы, таблицы для сравнения версий и file_id
+        Telegram, чтобы смена алгоритма не выглядела как изменение файлов.
+        """
+        conn = sqlite3.connect(self.db_name)
+        cursor = conn.cursor()
+        try:
+            pairs = [(new_hash, old_hash) for old_hash, new_hash in mapping.items()]
+            cursor.executemany('UPDATE schedule_files SET file_hash = ? WHERE file_hash = ?', pairs)
+            cursor.executemany('UPDATE OR REPLACE schedule_tables SET file_hash = ? WHERE file_hash = ?', pairs)
+            cursor.executemany('UPDATE OR REPLACE telegram_files SET file_hash = ? WHERE file_hash = ?', pairs)
+            cursor.execute('DELETE FROM file_fingerprints')
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Ошибка замены хэшей файлов: {e}")
+        finally:
+            conn.close()
+    
     def save_file_info(self, filename, file_hash, building):
         """Сохранение информации о файле"""
         conn = sqlite3.connect(self.db_name)
@@ -155,4 +433,296 @@ class DatabaseManager:
             logger.error(f"Ошибка очистки устаревших файлов: {e}")
         finally:
             conn.close()
-
+    
+    def get_telegram_file_ids(self, file_hash, variant):
+        """Получение file_id Telegram всех страниц уже загруженного файла"""
+        conn = sqlite3.connect(self.db_name)
+        cursor = conn.cursor()
+        try:
+            cursor.execute('''
+                SELECT page, pages, file_id FROM telegram_files
+                WHERE file_hash = ? AND variant = ? ORDER BY page
+            ''', (file_hash, variant))
+            rows = cursor.fetchall()
+            if not rows or len(rows) != rows[0][1] or [row[0] for row in rows] != list(range(len(rows))):
+                return None
+            return [row[2] for row in rows]
+        except Exception as e:
+            logger.error(f"Ошибка получения file_id: {e}")
+            return None
+        finally:
+            conn.close()
+    
+    def save_telegram_file_id(self, file_hash, variant, file_id, page=0, pages=1):
+        """Сохранение file_id Telegram для загруженной страницы файла"""
+        conn = sqlite3.connect(self.db_name)
+        cursor = conn.cursor()
+        try:
+            cursor.execute('''
+                INSERT OR REPLACE INTO telegram_files (file_hash, variant, page, pages, file_id, created_at)
+                VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ''', (file_hash, variant, page, pages, file_id))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Ошибка сохранения file_id: {e}")
+        finally:
+            conn.close()
+    
+    def delete_telegram_file_id(self, file_hash, variant):
+        """Удаление недействительных file_id всех страниц файла"""
+        conn = sqlite3.connect(self.db_name)
+        cursor = conn.cursor()
+        try:
+            cursor.execute('DELETE FROM telegram_files WHERE file_hash = ? AND variant = ?', (file_hash, variant))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Ошибка удаления file_id: {e}")
+        finally:
+            conn.close()
+    
+    def save_encoding_stats(self, file_hash, variant, stats):
+        """Сохранение выбранного формата и размеров страниц файла"""
+        conn = sqlite3.connect(self.db_name)
+        cursor = conn.cursor()
+        try:
+            cursor.executemany('''
+                INSERT OR REPLACE INTO encoding_stats (file_hash, variant, page, format, size, jpeg_size, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ''', [(file_hash, variant, page, info['format'], info['size'], info['jpeg_size'])
+                  for page, info in enumerate(stats)])
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Ошибка сохранения статистики кодирования: {e}")
+        finally:
+            conn.close()
+    
+    def get_encoding_summary(self):
+        """Количество страниц, итоговый размер и размер в JPEG по форматам"""
+        conn = sqlite3.connect(self.db_name)
+        cursor = conn.cursor()
+        try:
+            cursor.execute('''
+                SELECT format, COUNT(*), SUM(size), SUM(jpeg_size)
+                FROM encoding_stats GROUP BY format ORDER BY format
+            ''')
+            return cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Ошибка получения статистики кодирования: {e}")
+            return []
+        finally:
+            conn.close()
+    
+    def get_parsed_schedule_hashes(self, parser_version=None):
+        """Хэши файлов, таблицы которых уже разобраны, с parser_version - этой версией разбора"""
+        conn = sqlite3.connect(self.db_name)
+        cursor = conn.cursor()
+        try:
+            if parser_version is None:
+                cursor.execute('SELECT file_hash FROM schedule_parsed')
+            else:
+                cursor.execute('SELECT file_hash FROM schedule_parsed WHERE parser_version = ?', (parser_version,))
+            return {row[0] for row in cursor.fetchall()}
+        except Exception as e:
+            logger.error(f"Ошибка получения разобранных файлов: {e}")
+            return set()
+        finally:
+            conn.close()
+    
+    def save_schedule_entries(self, file_hash, entries, cells=(), parser_version=None):
+        """Сохранение записей занятий и ячеек файла, заменяет прежние записи с тем же хэшем
+        
+        cells - кортежи (номер таблицы, номер строки, номер колонки, текст,
+        заголовок колонки, подпись строки) для полнотекстового поиска.
+        """
+        conn = sqlite3.connect(self.db_name)
+        cursor = conn.cursor()
+        try:
+            cursor.execute('DELETE FROM schedule_entries WHERE file_hash = ?', (file_hash,))
+            cursor.execute('DELETE FROM schedule_cells WHERE file_hash = ?', (file_hash,))
+            cursor.executemany('''
+                INSERT INTO schedule_cells (text, header, row_label, file_hash, table_index, row_index, col_index)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', [(text, header, row_label, file_hash, table_index, row_index, col_index)
+                  for table_index, row_index, col_index, text, header, row_label in cells])
+            cursor.executemany('''
+                INSERT INTO schedule_entries (file_hash, group_name, day_index, lesson_date, pair_number, time,
+                                              subject, teacher, room, raw_text, table_index, row_index, col_index)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(file_hash, entry['group_name'], entry['day_index'], entry['lesson_date'], entry['pair_number'],
+                   entry['time'], entry['subject'], entry['teacher'], entry['room'], entry['raw_text'],
+                   entry['table_index'], entry['row_index'], entry['col_index']) for entry in entries])
+            cursor.execute('''
+                INSERT OR REPLACE INTO schedule_parsed (file_hash, entries, parser_version, parsed_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ''', (file_hash, len(entries), parser_version))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Ошибка сохранения записей расписания: {e}")
+        finally:
+            conn.close()
+    
+    def save_schedule_tables(self, file_hash, tables):
+        """Сохранение извлеченных таблиц файла для сравнения со следующей версией"""
+        conn = sqlite3.connect(self.db_name)
+        cursor = conn.cursor()
+        try:
+            cursor.execute('''
+                INSERT OR REPLACE INTO schedule_tables (file_hash, tables_json, created_at)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+            ''', (file_hash, json.dumps(tables, ensure_ascii=False)))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Ошибка сохранения таблиц файла: {e}")
+        finally:
+            conn.close()
+    
+    def get_schedule_tables(self, file_hash):
+        """Сохраненные таблицы файла или None"""
+        conn = sqlite3.connect(self.db_name)
+        cursor = conn.cursor()
+        try:
+            cursor.execute('SELECT tables_json FROM schedule_tables WHERE file_hash = ?', (file_hash,))
+            result = cursor.fetchone()
+            return json.loads(result[0]) if result else None
+        except Exception as e:
+            logger.error(f"Ошибка получения таблиц файла: {e}")
+            return None
+        finally:
+            conn.close()
+    
+    def update_schedule_sources(self, building, files):
+        """Текущие файлы корпуса и удаление записей файлов, которых больше нет
+        
+        files - словарь имя файла -> хэш.
+        """
+        conn = sqlite3.connect(self.db_name)
+        cursor = conn.cursor()
+        try:
+            cursor.execute('DELETE FROM schedule_sources WHERE building = ?', (building,))
+            cursor.executemany('''
+                INSERT INTO schedule_sources (filename, building, file_hash, updated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ''', [(filename, building, file_hash) for filename, file_hash in files.items() if file_hash])
+            cursor.execute('DELETE FROM schedule_entries WHERE file_hash NOT IN (SELECT file_hash FROM schedule_sources)')
+            cursor.execute('DELETE FROM schedule_parsed WHERE file_hash NOT IN (SELECT file_hash FROM schedule_sources)')
+            cursor.execute('DELETE FROM schedule_cells WHERE file_hash NOT IN (SELECT file_hash FROM schedule_sources)')
+            # Таблицы прошлой версии нужны для сравнения, пока файл не отправлен
+            cursor.execute('''
+                DELETE FROM schedule_tables
+                WHERE file_hash NOT IN (SELECT file_hash FROM schedule_sources)
+                  AND file_hash NOT IN (SELECT file_hash FROM schedule_files WHERE file_hash IS NOT NULL)
+            ''')
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Ошибка обновления источников расписания: {e}")
+        finally:
+            conn.close()
+    
+    def get_schedule_entries(self, group_name=None, building=None, day_index=None, lesson_date=None):
+        """Записи занятий текущих файлов расписания с фильтрами"""
+        conn = sqlite3.connect(self.db_name)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        
+        conditions = []
+        params = []
+        for column, value in (('e.group_name', group_name), ('s.building', building),
+                              ('e.day_index', day_index), ('e.lesson_date', lesson_date)):
+            if value is not None:
+                conditions.append(f'{column} = ?')
+                params.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        
+        try:
+            cursor.execute(f'''
+                SELECT DISTINCT e.*, s.building, s.filename
+                FROM schedule_entries e
+                JOIN schedule_sources s ON s.file_hash = e.file_hash
+                {where}
+                ORDER BY s.building, e.day_index, e.pair_number, e.time, e.table_index, e.row_index
+            ''', params)
+            return [dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Ошибка получения записей расписания: {e}")
+            return []
+        finally:
+            conn.close()
+    
+    def get_schedule_groups(self, building=None):
+        """Названия групп, найденных в текущих файлах расписания"""
+        conn = sqlite3.connect(self.db_name)
+        cursor = conn.cursor()
+        try:
+            if building is not None:
+                cursor.execute('''
+                    SELECT DISTINCT e.group_name FROM schedule_entries e
+                    JOIN schedule_sources s ON s.file_hash = e.file_hash
+                    WHERE s.building = ? ORDER BY e.group_name
+                ''', (building,))
+            else:
+                cursor.execute('''
+                    SELECT DISTINCT e.group_name FROM schedule_entries e
+                    JOIN schedule_sources s ON s.file_hash = e.file_hash
+                    ORDER BY e.group_name
+                ''')
+            return [row[0] for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Ошибка получения списка групп: {e}")
+            return []
+        finally:
+            conn.close()
+    
+    def get_schedule_version(self, building=None):
+        """Хэш набора текущих файлов расписания, меняется при любом их изменении"""
+        conn = sqlite3.connect(self.db_name)
+        cursor = conn.cursor()
+        try:
+            if building is not None:
+                cursor.execute('SELECT building, filename, file_hash FROM schedule_sources WHERE building = ? '
+                               'ORDER BY building, filename', (building,))
+            else:
+                cursor.execute('SELECT building, filename, file_hash FROM schedule_sources ORDER BY building, filename')
+            digest = hashlib.md5()
+            for row in cursor.fetchall():
+                digest.update(f"{row[0]}:{row[1]}:{row[2]}\n".encode('utf-8'))
+            return digest.hexdigest()
+        except Exception as e:
+            logger.error(f"Ошибка получения версии расписания: {e}")
+            return None
+        finally:
+            conn.close()
+    
+    def search_schedule_cells(self, query, limit=20):
+        """Полнотекстовый поиск по ячейкам текущих файлов расписания
+        
+        Каждое слово запроса ищется как префикс, все слова должны
+        встретиться в одной ячейке.
+        """
+        words = re.findall(r'\w+', query)
+        if not words:
+            return []
+        match = ' AND '.join(f'"{word}"*' for word in words)
+        
+        conn = sqlite3.connect(self.db_name)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        try:
+            cursor.execute('''
+                SELECT schedule_cells.text, schedule_cells.header, schedule_cells.row_label,
+                       schedule_cells.table_index, schedule_cells.row_index, schedule_cells.col_index,
+                       s.building, s.filename
+                FROM schedule_cells
+                JOIN schedule_sources s ON s.file_hash = schedule_cells.file_hash
+                WHERE schedule_cells MATCH ?
+                ORDER BY s.building, s.filename, schedule_cells.table_index,
+                         schedule_cells.row_index, schedule_cells.col_index
+                LIMIT ?
+            ''', (match, limit))
+            return [dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Ошибка поиска по расписанию: {e}")
+            return []
+        finally:
+            conn.close()
@@ -0,0 +1,147 @@
+import posixpath
+import zipfile
+import logging
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+OFFICE_DOCUMENT_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument'
+
+W_BODY = W_NS + 'body'
+W_P = W_NS + 'p'
+W_R = W_NS + 'r'
+W_HYPERLINK = W_NS + 'hyperlink'
+W_T = W_NS + 't'
+W_TAB = W_NS + 'tab'
+W_PTAB = W_NS + 'ptab'
+W_BR = W_NS + 'br'
+W_CR = W_NS + 'cr'
+W_NO_BREAK_HYPHEN = W_NS + 'noBreakHyphen'
+W_TBL = W_NS + 'tbl'
+W_TR = W_NS + 'tr'
+W_TC = W_NS + 'tc'
+W_TR_PR = W_NS + 'trPr'
+W_TC_PR = W_NS + 'tcPr'
+W_GRID_BEFORE = W_NS + 'gridBefore'
+W_GRID_SPAN = W_NS + 'gridSpan'
+W_V_MERGE = W_NS + 'vMerge'
+W_VAL = W_NS + 'val'
+W_TYPE = W_NS + 'type'
+
+def find_document_part(zip_file):
+    """Путь основной части документа внутри архива DOCX"""
+    try:
+        rels = etree.fromstring(zip_file.read('_rels/.rels'))
+        for rel in rels.iter(REL_NS + 'Relationship'):
+            if rel.get('Type') == OFFICE_DOCUMENT_REL:
+                return posixpath.normpath(rel.get('Target').lstrip('/'))
+    except KeyError:
+        pass
+    return 'word/document.xml'
+
+def run_text(run):
+    """Текст фрагмента w:r по правилам python-docx"""
+    parts = []
+    for child in run:
+        tag = child.tag
+        if tag == W_T:
+            parts.append(child.text or '')
+        elif tag == W_TAB or tag == W_PTAB:
+            parts.append('\t')
+        elif tag == W_BR:
+            if child.get(W_TYPE, 'textWrapping') == 'textWrapping':
+                parts.append('\n')
+        elif tag == W_CR:
+            parts.append('\n')
+        elif tag == W_NO_BREAK_HYPHEN:
+            parts.append('-')
+    return ''.join(parts)
+
+def paragraph_text(paragraph):
+    """Текст абзаца w:p по правилам python-docx"""
+    parts = []
+    for child in paragraph:
+        if child.tag == W_R:
+            parts.append(run_text(child))
+        elif child.tag == W_HYPERLINK:
+            parts.extend(run_text(run) for run in child if run.tag == W_R)
+    return ''.join(parts)
+
+def property_value(element, props_tag, prop_tag, default=None):
+    props = element.find(props_tag)
+    if props is None:
+        return default
+    prop = props.find(prop_tag)
+    if prop is None:
+        return default
+    return prop.get(W_VAL, 'continue' if prop_tag == W_V_MERGE else default)
+
+def row_cells(row, cells_above):
+    """Тексты ячеек строки w:tr с учетом объединений, как в row.cells python-docx
+
+    cells_above - тексты ячеек предыдущей строки по номеру колонки сетки,
+    нужны для продолжений вертикального объединения. Словарь обновляется
+    значениями текущей строки.
+    """
+    cells = []
+    grid_offset = int(property_value(row, W_TR_PR, W_GRID_BEFORE, 0))
+    current_row = {}
+
+    for tc in row:
+        if tc.tag != W_TC:
+            continue
+        span = int(property_value(tc, W_TC_PR, W_GRID_SPAN, 1))
+        if property_value(tc, W_TC_PR, W_V_MERGE) == 'continue':
+            text = cells_above.get(grid_offset, '')
+        else:
+            text = '\n'.join(paragraph_text(p) for p in tc if p.tag == W_P)
+        for i in range(span):
+            current_row[grid_offset + i] = text
+            cells.append(text)
+        grid_offset += span
+
+    cells_above.clear()
+    cells_above.update(current_row)
+    return cells
+
+def release(element):
+    """Освобождение обработанного элемента и его предшественников"""
+    element.clear()
+    parent = element.getparent()
+    if parent is not None:
+        while element.getprevious() is not None:
+            del parent[0]
+
+def iter_docx_blocks(docx_path):
+    """Потоковое чтение абзацев и строк таблиц верхнего уровня DOCX
+
+    Выдает пары ('paragraph', текст), ('row', список текстов ячеек) и
+    ('table_end', None) в порядке документа. Обработанные элементы сразу
+    освобождаются, поэтому в памяти держится не больше одного абзаца или
+    строки таблицы.
+    """
+    with zipfile.ZipFile(docx_path) as zip_file:
+        part_name = find_document_part(zip_file)
+        with zip_file.open(part_name) as stream:
+            cells_above = {}
+            for _, element in etree.iterparse(stream, events=('end',), tag=(W_P, W_TR, W_TBL),
+                                              huge_tree=True):
+                parent = element.getparent()
+                if parent is None:
+                    continue
+
+                if element.tag == W_P:
+                    if parent.tag == W_BODY:
+                        yield 'paragraph', paragraph_text(element)
+                        release(element)
+                elif element.tag == W_TR:
+                    table = parent
+                    if table.getparent() is not None and table.getparent().tag == W_BODY:
+                        yield 'row', row_cells(element, cells_above)
+                        release(element)
+                elif parent.tag == W_BODY:
+                    cells_above = {}
+                    yield 'table_end', None
+                    release(element)
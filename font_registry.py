@@ -0,0 +1,94 @@
+import os
+import io
+import threading
+import logging
+from PIL import ImageFont
+
+logger = logging.getLogger(__name__)
+
+FONTS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fonts')
+
+FONT_PATHS = [
+    os.path.join(FONTS_FOLDER, 'DejaVuSans.ttf'),
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    '/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf',
+    '/usr/share/fonts/truetype/freefont/FreeSans.ttf',
+    '/usr/share/fonts/truetype/noto/NotoSans-Regular.ttf',
+    'C:/Windows/Fonts/arial.ttf',
+    '/System/Library/Fonts/SFNSDisplay.ttf'
+]
+
+class FontRegistry:
+    """Общий для процесса реестр шрифтов с поддержкой русского языка
+
+    Путь к шрифту выбирается один раз, файл читается в память один раз,
+    а каждый размер загружается из этих байтов при первом обращении.
+    Байты шрифта можно передать в дочерние процессы через export_state.
+    """
+
+    def __init__(self, font_paths=None):
+        self.font_paths = font_paths or FONT_PATHS
+        self._font_path = None
+        self._resolved = False
+        self._font_data = {}
+        self._fonts = {}
+        self._lock = threading.RLock()
+
+    def resolve_font_path(self):
+        """Выбор первого доступного файла шрифта"""
+        with self._lock:
+            if not self._resolved:
+                self._font_path = next((path for path in self.font_paths if os.path.exists(path)), None)
+                self._resolved = True
+                if self._font_path:
+                    logger.info(f"Используется шрифт {self._font_path}")
+                else:
+                    logger.warning("Шрифт с поддержкой русского языка не найден, используется стандартный")
+            return self._font_path
+
+    def get_font_data(self, font_path):
+        """Содержимое файла шрифта, прочитанное один раз"""
+        with self._lock:
+            data = self._font_data.get(font_path)
+            if data is None:
+                with open(font_path, 'rb') as f:
+                    data = f.read()
+                self._font_data[font_path] = data
+            return data
+
+    def get_font(self, size=10):
+        """Шрифт нужного размера"""
+        with self._lock:
+            font_path = self.resolve_font_path()
+            key = (font_path, size)
+            font = self._fonts.get(key)
+            if font is None:
+                try:
+                    if font_path:
+                        font = ImageFont.truetype(io.BytesIO(self.get_font_data(font_path)), size)
+                    else:
+                        font = ImageFont.load_default()
+                except Exception as e:
+                    logger.error(f"Ошибка при загрузке шрифта: {e}")
+                    font = ImageFont.load_default()
+                self._fonts[key] = font
+            return font
+
+    def export_state(self):
+        """Путь и байты шрифта для передачи в дочерний процесс"""
+        with self._lock:
+            font_path = self.resolve_font_path()
+            if not font_path:
+                return None, None
+            return font_path, self.get_font_data(font_path)
+
+    def load_state(self, state):
+        """Восстановление шрифта из export_state без чтения с диска"""
+        font_path, data = state
+        with self._lock:
+            self._font_path = font_path
+            self._resolved = True
+            if font_path and data is not None:
+                self._font_data[font_path] = data
+
+font_registry = FontRegistry()
@@ -0,0 +1,109 @@
+import io
+import time
+import logging
+from PIL import Image, ImageChops, ImageStat
+
+logger = logging.getLogger(__name__)
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+def image_extension(data):
+    """Расширение файла по содержимому закодированного изображения"""
+    return '.png' if data.startswith(PNG_SIGNATURE) else '.jpg'
+
+def flatten_image(img):
+    """Приведение изображения к RGB или L на белом фоне"""
+    if img.mode == '1':
+        return img.convert('L')
+    if img.mode in ('RGBA', 'LA'):
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[-1])
+        return background
+    if img.mode in ('RGB', 'L'):
+        return img
+    return img.convert('RGB')
+
+class AdaptiveEncoder:
+    """Выбор самого компактного формата для изображения расписания
+
+    JPEG кодируется всегда: он служит запасным вариантом и базой для оценки
+    экономии. Остальные форматы пробуются по очереди, пока не исчерпан
+    бюджет времени. Кандидат принимается, если средняя ошибка на пикселях
+    текста и линий не превышает max_ink_error.
+    """
+
+    FORMATS = ('png-1bit', 'png-palette', 'jpeg')
+
+    def __init__(self, formats=FORMATS, time_budget=2.0, max_ink_error=12.0,
+                 jpeg_quality=85, palette_colors=16, ink_threshold=200):
+        self.formats = tuple(formats)
+        self.time_budget = time_budget
+        self.max_ink_error = max_ink_error
+        self.jpeg_quality = jpeg_quality
+        self.palette_colors = palette_colors
+        self.ink_threshold = ink_threshold
+
+    def variant(self):
+        """Идентификатор настроек кодирования для ключей кэша"""
+        return '+'.join(self.formats)
+
+    def encode_jpeg(self, img, gray):
+        img_buffer = io.BytesIO()
+        flatten_image(img).save(img_buffer, format='JPEG', quality=self.jpeg_quality)
+        return img_buffer.getvalue()
+
+    def encode_png_palette(self, img, gray):
+        img_buffer = io.BytesIO()
+        gray.quantize(self.palette_colors).save(img_buffer, format='PNG', optimize=True)
+        return img_buffer.getvalue()
+
+    def encode_png_1bit(self, img, gray):
+        img_buffer = io.BytesIO()
+        if img.mode == '1':
+            bilevel = img
+        else:
+            bilevel = gray.point(lambda value: 255 if value >= 160 else 0, mode='1')
+        bilevel.save(img_buffer, format='PNG', optimize=True)
+        return img_buffer.getvalue()
+
+    def ink_error(self, data, gray, ink_mask):
+        """Средняя ошибка яркости на пикселях текста и линий"""
+        decoded = Image.open(io.BytesIO(data)).convert('L')
+        difference = ImageChops.difference(decoded, gray)
+        if ink_mask.getbbox() is None:
+            return ImageStat.Stat(difference).mean[0]
+        return ImageStat.Stat(difference, mask=ink_mask).mean[0]
+
+    def encode(self, img):
+        """Кодирование изображения, возвращает байты и сведения о выборе"""
+        started = time.monotonic()
+        gray = img.convert('L')
+        ink_mask = gray.point(lambda value: 255 if value < self.ink_threshold else 0)
+
+        jpeg_data = self.encode_jpeg(img, gray)
+        best_format, best_data = 'jpeg', jpeg_data
+
+        encoders = {
+            'png-1bit': self.encode_png_1bit,
+            'png-palette': self.encode_png_palette,
+        }
+        for name in self.formats:
+            if name not in encoders:
+                continue
+            if time.monotonic() - started > self.time_budget:
+                logger.info(f"Бюджет времени кодирования исчерпан перед {name}")
+                break
+            try:
+                data = encoders[name](img, gray)
+                if len(data) < len(best_data) and self.ink_error(data, gray, ink_mask) <= self.max_ink_error:
+                    best_format, best_data = name, data
+            except Exception as e:
+                logger.error(f"Ошибка кодирования в {name}: {e}")
+
+        info = {
+            'format': best_format,
+            'size': len(best_data),
+            'jpeg_size': len(jpeg_data),
+            'elapsed': time.monotonic() - started,
+        }
+        return best_data, info
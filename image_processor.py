@@ -1,63 +1,60 @@
-import os
-import re
-import tempfile
-import requests
 import io
-from PIL import Image, ImageDraw, ImageFont
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from PIL import Image, ImageDraw
 from docx import Document
 import xml.etree.ElementTree as ET
 import logging
+from text_measure import TextMeasurer
+from image_encoder import AdaptiveEncoder, flatten_image
+from font_registry import font_registry
+from docx_stream import iter_docx_blocks
+from xml_stream import read_xml_tables
+from text_filters import text_filter, normalize_whitespace, collapse_times
+from schedule_parser import slice_table, normalize_group_name
+from layout import TableLayout, DocumentLayout, CELL_LINE_HEIGHT, CELL_PADDING, MAX_CELL_LINES, COMPACT_ROW_HEIGHT
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Увеличивать при любом изменении, влияющем на итоговое изображение
+RENDER_VERSION = '6'
+
+# Режимы холста: цветной, оттенки серого и черно-белый без сглаживания
+COLOR_MODES = ('RGB', 'L', '1')
+
 class ImageProcessor:
-    def __init__(self):
-        self.FONT_SMALL = self.get_russian_font(10)
-        self.FONT_REGULAR = self.get_russian_font(14)
+    def __init__(self, registry=None, docx_engine='stream', xml_engine='stream', filters=None,
+                 page_height=None, executor=None, encoder=None, color_mode='RGB'):
+        if color_mode not in COLOR_MODES:
+            raise ValueError(f"Неизвестный режим холста: {color_mode}")
+        self.fonts = registry or font_registry
+        self.color_mode = color_mode
+        self.encoder = encoder or AdaptiveEncoder()
+        self.docx_engine = docx_engine
+        self.xml_engine = xml_engine
+        self.page_height = page_height
+        self.executor = executor
+        self.text_filter = filters or text_filter
+        self.measurer = TextMeasurer()
+    
+    @property
+    def FONT_SMALL(self):
+        return self.fonts.get_font(10)
+    
+    @property
+    def FONT_REGULAR(self):
+        return self.fonts.get_font(14)
     
     def get_russian_font(self, size=10):
         """Получение шрифта с поддержкой русского языка"""
-        try:
-            font_paths = [
-                '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
-                '/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf',
-                '/usr/share/fonts/truetype/freefont/FreeSans.ttf',
-                '/usr/share/fonts/truetype/noto/NotoSans-Regular.ttf',
-                'C:/Windows/Fonts/arial.ttf',
-                '/System/Library/Fonts/SFNSDisplay.ttf'
-            ]
-            
-            for font_path in font_paths:
-                if os.path.exists(font_path):
-                    return ImageFont.truetype(font_path, size)
-            
-            try:
-                response = requests.get('https://github.com/googlefonts/noto-fonts/raw/main/hinted/ttf/NotoSans/NotoSans-Regular.ttf', timeout=10)
-                if response.status_code == 200:
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.ttf') as f:
-                        f.write(response.content)
-                        font = ImageFont.truetype(f.name, size)
-                        os.unlink(f.name)
-                        return font
-            except:
-                pass
-                
-        except Exception as e:
-            logger.error(f"Ошибка при загрузке шрифта: {e}")
-        
-        return ImageFont.load_default()
+        return self.fonts.get_font(size)
     
     def get_text_dimensions(self, text, font):
         """Получение размеров текста"""
-        try:
-            bbox = font.getbbox(text)
-            return bbox[2] - bbox[0], bbox[3] - bbox[1]
-        except:
-            try:
-                return font.getsize(text)
-            except:
-                return len(text) * 6, 12
+        return self.measurer.text_dimensions(text, font)
     
     def calculate_table_width(self, table_data, font):
         """Рассчитывает оптимальную ширину таблицы"""
@@ -77,308 +74,316 @@ class ImageProcessor:
         
         return sum(col_widths)
     
-    def docx_to_image(self, docx_path):
-        """Конвертация DOCX файла в изображение"""
-        try:
-            doc = Document(docx_path)
-            
-            skip_patterns = [
-                r'УТВЕРЖДАЮ',
-                r'Заместитель директора',
-                r'Зам. директора по УМР',
-                r'Заведующая отделением',
-                r'Диспетчер __________________Миронова Е.В',
-                r'Расписание на сайте',
-                r'«\d+»\s+\w+\s+\d{4}\s+года',
-                r'\d{1,2}\s+\w+\s+\d{4}\s+года',
-                r'Четверг.*неделя',
-                r'Понедельник.*неделя',
-                r'Вторник.*неделя',
-                r'Среда.*неделя',
-                r'Пятница.*неделя',
-                r'Суббота.*неделя'
-            ] 
-            
-            def process_time_in_text(text):
-                """Обработка времени только для текста вне таблиц"""
-                time_pattern = r'\b\d{1,2}[:.\-]\d{2}\b'
-                time_matches = re.findall(time_pattern, text)
-                
-                if len(time_matches) > 2:
-                    first_time = time_matches[0]
-                    last_time = time_matches[-1]
-                    
-                    def replace_time(match):
-                        time_str = match.group()
-                        if time_str == first_time or time_str == last_time:
-                            return time_str
-                        return ""
-                    
-                    processed_text = re.sub(time_pattern, replace_time, text)
-                    processed_text = re.sub(r'\s+', ' ', processed_text).strip()
-                    return processed_text
-                return text
-            
-            useful_content = []
-            tables_data = []
-            
-            for paragraph in doc.paragraphs:
-                text = paragraph.text.strip()
-                if text and not any(re.search(pattern, text, re.IGNORECASE) for pattern in skip_patterns):
-                    processed_text = process_time_in_text(text)
+    def wrap_text(self, text, font, max_width):
+        """Перенос текста по словам в пределах ширины"""
+        return self.measurer.wrap_cells([text], font, max_width)[0]
+    
+    def read_docx_blocks(self, docx_path, engine):
+        """Абзацы и строки таблиц DOCX в порядке документа"""
+        if engine == 'stream':
+            yield from iter_docx_blocks(docx_path)
+            return
+        
+        doc = Document(docx_path)
+        for paragraph in doc.paragraphs:
+            yield 'paragraph', paragraph.text
+        for table in doc.tables:
+            for row in table.rows:
+                yield 'row', [cell.text for cell in row.cells]
+            yield 'table_end', None
+    
+    def extract_docx_content(self, docx_path):
+        """Извлечение полезного текста и таблиц из DOCX файла"""
+        if self.docx_engine == 'stream':
+            try:
+                return self.collect_docx_content(self.read_docx_blocks(docx_path, 'stream'))
+            except Exception as e:
+                logger.warning(f"Потоковое чтение {docx_path} не удалось, используется python-docx: {e}")
+        return self.collect_docx_content(self.read_docx_blocks(docx_path, 'python-docx'))
+    
+    def collect_docx_content(self, blocks):
+        """Отбор полезного текста и таблиц из потока блоков DOCX"""
+        useful_content = []
+        tables_data = []
+        table_data = []
+        
+        for kind, value in blocks:
+            if kind == 'paragraph':
+                processed_text = self.text_filter.filter_paragraph(value)
+                if processed_text:
                     useful_content.append(processed_text)
             
-            max_table_width = 0
-            for table in doc.tables:
-                table_data = []
-                for row in table.rows:
-                    row_data = []
-                    for cell in row.cells:
-                        cell_text = cell.text.strip()
-                        cell_text = re.sub(r'\s+', ' ', cell_text)
-                        row_data.append(cell_text)
-                    if any(cell.strip() for cell in row_data):
-                        table_data.append(row_data)
-                
+            elif kind == 'row':
+                row_data = [normalize_whitespace(cell_text) for cell_text in value]
+                if any(cell.strip() for cell in row_data):
+                    table_data.append(row_data)
+            
+            elif kind == 'table_end':
                 if table_data and len(table_data) > 1:
                     tables_data.append(table_data)
-                    table_width = self.calculate_table_width(table_data, self.FONT_SMALL)
-                    max_table_width = max(max_table_width, table_width)
-            
-            if not useful_content and not tables_data:
-                return None
-            
-            margin = 35
-            line_height = 30
-            table_spacing = 25
-            
-            if max_table_width > 0:
-                image_width = min(max_table_width + margin * 2, 1200)
-            else:
-                image_width = 600
-            
-            total_height = margin * 8
-            total_height += len(useful_content) * line_height
-            
-            for table_data in tables_data:
-                table_height = 0
-                for row in table_data:
-                    max_lines = 1
-                    for cell in row:
-                        if cell:
-                            words = cell.split()
-                            current_width = 0
-                            lines_needed = 1
-                            for word in words:
-                                word_width, _ = self.get_text_dimensions(word + " ", self.FONT_SMALL)
-                                current_width += word_width
-                                if current_width > 150:
-                                    lines_needed += 1
-                                    current_width = word_width
-                            max_lines = max(max_lines, lines_needed)
-                    table_height += max_lines * 12 + 6
-                total_height += table_height + table_spacing
+                table_data = []
+        
+        return useful_content, tables_data
+    
+    def layout_table(self, table_data, x_start, y, available_width):
+        """Расчет ширин колонок, высот строк и переносов для таблицы"""
+        col_widths = [0] * len(table_data[0])
+        for row in table_data:
+            for i, cell in enumerate(row):
+                if i < len(col_widths) and cell:
+                    text_width, _ = self.get_text_dimensions(cell, self.FONT_SMALL)
+                    col_widths[i] = max(col_widths[i], min(text_width + 10, 250))
+        
+        if sum(col_widths) > available_width:
+            min_col_width = 60
             
-            img = Image.new('RGB', (image_width, total_height), color='white')
-            draw = ImageDraw.Draw(img)
+            for i in range(len(col_widths)):
+                col_widths[i] = max(min_col_width, col_widths[i])
             
-            y = margin
+            if sum(col_widths) > available_width:
+                scale_factor = available_width / sum(col_widths)
+                col_widths = [int(w * scale_factor) for w in col_widths]
+        
+        table_x = x_start + (available_width - sum(col_widths)) // 2
+        
+        column_lines = []
+        for i, col_width in enumerate(col_widths):
+            column_cells = [row[i] if i < len(row) else '' for row in table_data]
+            column_lines.append(self.measurer.wrap_cells(column_cells, self.FONT_SMALL, col_width - 4))
+        
+        cell_lines = []
+        row_heights = []
+        for row_idx, row in enumerate(table_data):
+            row_lines = [column_lines[i][row_idx] for i in range(min(len(row), len(col_widths)))]
+            max_cell_lines = max([1] + [len(lines) for lines in row_lines])
+            cell_lines.append(row_lines)
+            row_heights.append(max_cell_lines * CELL_LINE_HEIGHT + CELL_PADDING)
+        
+        return TableLayout(table_x, y, col_widths, row_heights, cell_lines)
+    
+    def layout_document(self, useful_content, tables_data):
+        """Размещение текста и таблиц документа за один проход"""
+        if not useful_content and not tables_data:
+            return None
+        
+        margin = 35
+        line_height = 30
+        table_spacing = 25
+        
+        max_table_width = 0
+        for table_data in tables_data:
+            max_table_width = max(max_table_width, self.calculate_table_width(table_data, self.FONT_SMALL))
+        
+        if max_table_width > 0:
+            image_width = min(max_table_width + margin * 2, 1200)
+        else:
+            image_width = 600
+        
+        y = margin
+        text_lines = []
+        for text in useful_content:
+            for line in self.wrap_text(text, self.FONT_REGULAR, image_width - margin * 2):
+                text_lines.append((margin, y, line))
+                y += line_height
+        
+        tables = []
+        for table_data in tables_data:
+            y += table_spacing
+            table = self.layout_table(table_data, margin, y, image_width - margin * 2)
+            tables.append(table)
+            y += table.height
+        
+        return DocumentLayout(image_width, y + margin, text_lines, tables, margin, line_height)
+    
+    def draw_table_layout(self, draw, table):
+        """Отрисовка размещенной таблицы"""
+        y = table.y
+        table_height = table.height
+        
+        draw.rectangle([table.x, y, table.x + table.width, y + table_height], 
+                     outline='black', fill='white', width=1)
+        
+        current_x = table.x
+        for col_idx, col_width in enumerate(table.col_widths):
+            if col_idx > 0:
+                draw.line([current_x, y, current_x, y + table_height], fill='black', width=1)
             
-            for text in useful_content:
-                lines = []
-                words = text.split()
-                current_line = ""
-                
-                for word in words:
-                    test_line = current_line + word + " "
-                    text_width, _ = self.get_text_dimensions(test_line, self.FONT_REGULAR)
-                    
-                    if text_width < image_width - margin * 2:
-                        current_line = test_line
-                    else:
-                        if current_line:
-                            lines.append(current_line.strip())
-                        current_line = word + " "
+            current_y = y
+            for row_idx, row_lines in enumerate(table.cell_lines):
+                if row_idx > 0:
+                    draw.line([current_x, current_y, current_x + col_width, current_y], 
+                             fill='black', width=1)
                 
-                if current_line:
-                    lines.append(current_line.strip())
+                if col_idx < len(row_lines):
+                    for line_idx, line_text in enumerate(row_lines[col_idx][:MAX_CELL_LINES]):
+                        text_y = current_y + 3 + line_idx * CELL_LINE_HEIGHT
+                        draw.text((current_x + 2, text_y), line_text, 
+                                 fill='black', font=self.FONT_SMALL)
                 
-                for line in lines:
-                    draw.text((margin, y), line, fill='black', font=self.FONT_REGULAR)
-                    y += line_height
+                current_y += table.row_heights[row_idx]
             
-            for table_data in tables_data:
-                if y > total_height - 50:
-                    break
-                    
-                y += table_spacing
-                
-                col_widths = [0] * len(table_data[0])
-                for row in table_data:
-                    for i, cell in enumerate(row):
-                        if i < len(col_widths) and cell:
-                            text_width, _ = self.get_text_dimensions(cell, self.FONT_SMALL)
-                            col_widths[i] = max(col_widths[i], min(text_width + 10, 250))
-                
-                total_table_width = sum(col_widths)
-                if total_table_width > image_width - margin * 2:
-                    min_col_width = 60
-                    available_width = image_width - margin * 2
-                    
-                    for i in range(len(col_widths)):
-                        col_widths[i] = max(min_col_width, col_widths[i])
-                    
-                    if sum(col_widths) > available_width:
-                        scale_factor = available_width / sum(col_widths)
-                        col_widths = [int(w * scale_factor) for w in col_widths]
-                    
-                    total_table_width = sum(col_widths)
-                
-                table_x = margin + (image_width - margin * 2 - total_table_width) // 2
-                
-                row_heights = []
-                for row in table_data:
-                    max_cell_lines = 1
-                    for i, cell in enumerate(row):
-                        if i < len(col_widths) and cell:
-                            lines = []
-                            words = cell.split()
-                            current_line = ""
-                            
-                            for word in words:
-                                test_line = current_line + word + " "
-                                text_width, _ = self.get_text_dimensions(test_line, self.FONT_SMALL)
-                                
-                                if text_width < col_widths[i] - 4:
-                                    current_line = test_line
-                                else:
-                                    if current_line:
-                                        lines.append(current_line.strip())
-                                    current_line = word + " "
-                            
-                            if current_line:
-                                lines.append(current_line.strip())
-                            
-                            max_cell_lines = max(max_cell_lines, len(lines))
-                    
-                    row_heights.append(max_cell_lines * 12 + 6)
-                
-                table_height = sum(row_heights)
+            current_x += col_width
+    
+    def draw_layout(self, layout):
+        """Отрисовка размещенного документа"""
+        img = Image.new(self.color_mode, (layout.width, layout.height), color='white')
+        draw = ImageDraw.Draw(img)
+        
+        for x, y, text in layout.text_lines:
+            draw.text((x, y), text, fill='black', font=self.FONT_REGULAR)
+        
+        for table in layout.tables:
+            self.draw_table_layout(draw, table)
+        
+        return img
+    
+    def paginate_layout(self, layout, page_height):
+        """Разбиение размещенного документа на страницы по границам строк таблиц
+        
+        Строки текста и строки таблиц переносятся на новую страницу целиком,
+        на страницах-продолжениях повторяется заголовок таблицы. Страница
+        выходит выше page_height только если на нее не помещается одна строка.
+        """
+        margin = layout.margin
+        pages = []
+        
+        def new_page():
+            return DocumentLayout(layout.width, 0, [], [], margin, layout.line_height)
+        
+        def has_content(page):
+            return bool(page.text_lines or page.tables)
+        
+        def finish_page(page, y):
+            page.height = y + margin
+            pages.append(page)
+        
+        page = new_page()
+        y = margin
+        prev_bottom = margin
+        
+        for x, line_y, text in layout.text_lines:
+            if has_content(page) and y + layout.line_height + margin > page_height:
+                finish_page(page, y)
+                page = new_page()
+                y = margin
+            page.text_lines.append((x, y, text))
+            y += layout.line_height
+            prev_bottom = line_y + layout.line_height
+        
+        for table in layout.tables:
+            gap = table.y - prev_bottom
+            chunk = None
+            
+            for row_idx, row_height in enumerate(table.row_heights):
+                needed = row_height
+                if chunk is None and (not pages or has_content(page)):
+                    needed += gap
                 
-                draw.rectangle([table_x, y, table_x + total_table_width, y + table_height], 
-                             outline='black', fill='white', width=1)
+                if has_content(page) and y + needed + margin > page_height:
+                    finish_page(page, y)
+                    page = new_page()
+                    y = margin
+                    chunk = None
                 
-                current_x = table_x
-                for col_idx, col_width in enumerate(col_widths):
-                    if col_idx > 0:
-                        draw.line([current_x, y, current_x, y + table_height], fill='black', width=1)
-                    
-                    current_y = y
-                    for row_idx, row in enumerate(table_data):
-                        if row_idx > 0:
-                            draw.line([current_x, current_y, current_x + col_width, current_y], 
-                                     fill='black', width=1)
-                        
-                        if col_idx < len(row):
-                            cell_text = row[col_idx]
-                            if cell_text:
-                                lines = []
-                                words = cell_text.split()
-                                current_line = ""
-                                
-                                for word in words:
-                                    test_line = current_line + word + " "
-                                    text_width, _ = self.get_text_dimensions(test_line, self.FONT_SMALL)
-                                    
-                                    if text_width < col_width - 4:
-                                        current_line = test_line
-                                    else:
-                                        if current_line:
-                                            lines.append(current_line.strip())
-                                        current_line = word + " "
-                                
-                                if current_line:
-                                    lines.append(current_line.strip())
-                                
-                                for line_idx, line_text in enumerate(lines):
-                                    if line_idx < 5:
-                                        text_y = current_y + 3 + line_idx * 12
-                                        draw.text((current_x + 2, text_y), line_text, 
-                                                 fill='black', font=self.FONT_SMALL)
-                        
-                        current_y += row_heights[row_idx]
-                    
-                    current_x += col_width
+                if chunk is None:
+                    if not pages or has_content(page):
+                        y += gap
+                    chunk = TableLayout(table.x, y, table.col_widths, [], [])
+                    page.tables.append(chunk)
+                    if row_idx > 0:
+                        chunk.row_heights.append(table.row_heights[0])
+                        chunk.cell_lines.append(table.cell_lines[0])
+                        y += table.row_heights[0]
                 
-                y += table_height
-            
-            img = img.crop((0, 0, image_width, min(y + margin, total_height)))
+                chunk.row_heights.append(row_height)
+                chunk.cell_lines.append(table.cell_lines[row_idx])
+                y += row_height
             
-            return img
+            prev_bottom = table.y + table.height
+        
+        if has_content(page) or not pages:
+            finish_page(page, y)
+        
+        return pages
+    
+    def docx_layout(self, docx_path):
+        """Размещение DOCX файла"""
+        useful_content, tables_data = self.extract_docx_content(docx_path)
+        return self.layout_document(useful_content, tables_data)
+    
+    def docx_to_image(self, docx_path):
+        """Конвертация DOCX файла в изображение"""
+        try:
+            layout = self.docx_layout(docx_path)
+            if layout is None:
+                return None
+            return self.draw_layout(layout)
             
         except Exception as e:
             logger.error(f"Ошибка при конвертации DOCX: {e}")
             return None
     
+    def read_xml_tables(self, xml_path):
+        """Таблицы XML файла с исходным текстом ячеек"""
+        if self.xml_engine == 'stream':
+            return read_xml_tables(xml_path)
+        
+        tree = ET.parse(xml_path)
+        root = tree.getroot()
+        
+        tables = []
+        for table_elem in root.findall('.//table') + root.findall('.//Table'):
+            table_data = []
+            for row_elem in table_elem.findall('.//row') + table_elem.findall('.//tr'):
+                row_data = [cell_elem.text or '' for cell_elem in row_elem.findall('.//cell') + row_elem.findall('.//td')]
+                if row_data:
+                    table_data.append(row_data)
+            if table_data:
+                tables.append(table_data)
+        return tables
+    
+    def extract_xml_tables(self, xml_path):
+        """Извлечение таблиц из XML файла с обработкой текста ячеек"""
+        tables_data = []
+        for table in self.read_xml_tables(xml_path):
+            tables_data.append([[collapse_times(normalize_whitespace(cell)) for cell in row] for row in table])
+        return tables_data
+    
+    def extract_tables(self, file_path):
+        """Таблицы файла расписания в том виде, в каком они попадают в изображение"""
+        if file_path.lower().endswith('.docx'):
+            return self.extract_docx_content(file_path)[1]
+        elif file_path.lower().endswith('.xml'):
+            return self.extract_xml_tables(file_path)
+        return []
+    
     def xml_to_image(self, xml_path):
         """Конвертация XML файла в изображение"""
         try:
-            tree = ET.parse(xml_path)
-            root = tree.getroot()
-            
-            def process_time_in_text(text):
-                """Оставляет только первое и последнее время в строке"""
-                time_pattern = r'\b\d{1,2}[:.\-]\d{2}\b'
-                time_matches = re.findall(time_pattern, text)
-                
-                if len(time_matches) > 2:
-                    first_time = time_matches[0]
-                    last_time = time_matches[-1]
-                    
-                    def replace_time(match):
-                        time_str = match.group()
-                        if time_str == first_time or time_str == last_time:
-                            return time_str
-                        return ""
-                    
-                    processed_text = re.sub(time_pattern, replace_time, text)
-                    processed_text = re.sub(r'\s+', ' ', processed_text).strip()
-                    return processed_text
-                
-                return text
-            
-            tables_data = []
-            
-            for table_elem in root.findall('.//table') + root.findall('.//Table'):
-                table_data = []
-                for row_elem in table_elem.findall('.//row') + table_elem.findall('.//tr'):
-                    row_data = []
-                    for cell_elem in row_elem.findall('.//cell') + row_elem.findall('.//td'):
-                        cell_text = cell_elem.text.strip() if cell_elem.text else ''
-                        cell_text = re.sub(r'\s+', ' ', cell_text)
-                        processed_text = process_time_in_text(cell_text)
-                        row_data.append(processed_text)
-                    if row_data:
-                        table_data.append(row_data)
-                if table_data:
-                    tables_data.append(table_data)
+            tables_data = self.extract_xml_tables(xml_path)
+            if not tables_data:
+                return None
             
             font = self.FONT_SMALL
             table_spacing = 20
             margin = 10
             max_width = 1600
             
+            tables_widths = [self.compact_column_widths(table_data, font, max_width - margin * 2)
+                             for table_data in tables_data]
+            content_width = max(sum(col_widths) for col_widths in tables_widths)
             total_height = margin * 2
-            for table in tables_data:
-                total_height += len(table) * 20 + table_spacing
+            for table_data in tables_data:
+                total_height += len(table_data) * COMPACT_ROW_HEIGHT + table_spacing
             
-            img = Image.new('RGB', (max_width, total_height), color='white')
+            image_width = min(content_width + margin * 2 + 1, max_width)
+            img = Image.new(self.color_mode, (image_width, total_height), color='white')
             draw = ImageDraw.Draw(img)
             
             y = margin
             
-            for table_data in tables_data:
-                y = self.draw_compact_table(draw, table_data, margin, y, font, max_width - margin * 2)
+            for table_data, col_widths in zip(tables_data, tables_widths):
+                y = self.draw_compact_table(draw, table_data, margin, y, font, max_width - margin * 2, col_widths)
                 y += table_spacing
             
             return img
@@ -387,11 +392,8 @@ class ImageProcessor:
             logger.error(f"Ошибка при конвертации XML: {e}")
             return None
     
-    def draw_compact_table(self, draw, table_data, x, y, font, max_width=1600):
-        """Рисование улучшенной компактной таблицы"""
-        if not table_data or not table_data[0]:
-            return y
-        
+    def compact_column_widths(self, table_data, font, max_width=1600):
+        """Ширины колонок компактной таблицы"""
         col_widths = [0] * len(table_data[0])
         for row in table_data:
             for i, cell in enumerate(row):
@@ -407,9 +409,22 @@ class ImageProcessor:
         if total_width > max_width:
             scale_factor = max_width / total_width
             col_widths = [int(w * scale_factor) for w in col_widths]
-            total_width = sum(col_widths)
         
-        row_height = 22
+        return col_widths
+    
+    def draw_compact_table(self, draw, table_data, x, y, font, max_width=1600, col_widths=None):
+        """Рисование улучшенной компактной таблицы"""
+        if not table_data or not table_data[0]:
+            return y
+        
+        if col_widths is None:
+            col_widths = self.compact_column_widths(table_data, font, max_width)
+        row_height = COMPACT_ROW_HEIGHT
+        
+        column_lines = []
+        for i, col_width in enumerate(col_widths):
+            column_cells = [row[i] if i < len(row) else '' for row in table_data]
+            column_lines.append(self.measurer.wrap_cells(column_cells, font, col_width - 4))
         
         for row_idx, row in enumerate(table_data):
             current_y = y + row_idx * row_height
@@ -425,23 +440,7 @@ class ImageProcessor:
                               outline='black', fill='white', width=1)
                 
                 if cell.strip():
-                    lines = []
-                    words = cell.split()
-                    current_line = ""
-                    
-                    for word in words:
-                        test_line = current_line + word + " "
-                        text_width, _ = self.get_text_dimensions(test_line, font)
-                        
-                        if text_width < cell_width - 4:
-                            current_line = test_line
-                        else:
-                            if current_line:
-                                lines.append(current_line.strip())
-                            current_line = word + " "
-                    
-                    if current_line:
-                        lines.append(current_line.strip())
+                    lines = column_lines[col_idx][row_idx]
                     
                     for line_idx, line_text in enumerate(lines[:2]):
                         text_x = current_x + 2
@@ -450,6 +449,106 @@ class ImageProcessor:
         
         return y + len(table_data) * row_height
     
+    def encode_image(self, img):
+        """Кодирование изображения в JPEG для отправки"""
+        img = flatten_image(img)
+        
+        img_buffer = io.BytesIO()
+        img.save(img_buffer, format='JPEG', optimize=True, quality=85, progressive=True)
+        return img_buffer.getvalue()
+    
+    def encode_page(self, img):
+        """Кодирование страницы в самый компактный подходящий формат"""
+        try:
+            return self.encoder.encode(img)
+        except Exception as e:
+            logger.error(f"Ошибка адаптивного кодирования: {e}")
+            data = self.encode_image(img)
+            return data, {'format': 'jpeg', 'size': len(data), 'jpeg_size': len(data), 'elapsed': 0.0}
+    
+    def render_layouts(self, layouts, stats=None):
+        """Отрисовка и кодирование страниц, в общем пуле процессов при нескольких страницах"""
+        encoded = None
+        if self.executor is not None and len(layouts) > 1:
+            try:
+                encoded = list(self.executor.map(render_layout_in_worker, layouts))
+            except BrokenProcessPool as e:
+                logger.error(f"Пул рендера недоступен, страницы рисуются в текущем процессе: {e}")
+                self.executor = None
+        if encoded is None:
+            encoded = [self.encode_page(self.draw_layout(layout)) for layout in layouts]
+        
+        if stats is not None:
+            stats.extend(info for _, info in encoded)
+        return [data for data, _ in encoded]
+    
+    def render_file(self, file_path, stats=None):
+        """Рендер файла в список готовых для отправки страниц изображения
+        
+        Если передан список stats, в него добавляются сведения о выбранном
+        формате каждой страницы.
+        """
+        if self.page_height and file_path.lower().endswith('.docx'):
+            try:
+                layout = self.docx_layout(file_path)
+                if layout is None:
+                    return None
+                return self.render_layouts(self.paginate_layout(layout, self.page_height), stats)
+            except Exception as e:
+                logger.error(f"Ошибка при постраничном рендере DOCX: {e}")
+                return None
+        
+        img = self.convert_to_image(file_path)
+        if img is None:
+            return None
+        data, info = self.encode_page(img)
+        if stats is not None:
+            stats.append(info)
+        return [data]
+    
+    def render_tables(self, title, tables, stats=None):
+        """Рендер отдельных таблиц с заголовком теми же средствами, что и документ"""
+        layout = self.layout_document([title] if title else [], tables)
+        if layout is None:
+            return None
+        if self.page_height:
+            return self.render_layouts(self.paginate_layout(layout, self.page_height), stats)
+        return self.render_layouts([layout], stats)
+    
+    def render_group_file(self, file_path, group_name, stats=None):
+        """Рендер только колонок одной группы
+
+        Пустой список, если группы в файле нет, None при ошибке рендера.
+        """
+        try:
+            tables = [sliced for sliced in (slice_table(table, group_name) for table in self.extract_tables(file_path))
+                      if sliced]
+            if not tables:
+                return []
+            return self.render_tables(f"Группа {group_name}", tables, stats)
+        except Exception as e:
+            logger.error(f"Ошибка при рендере расписания группы {group_name}: {e}")
+            return None
+    
+    def group_variant(self, group_name):
+        """Идентификатор рендера колонок группы для ключей кэша"""
+        group_key = hashlib.sha1(normalize_group_name(group_name).encode('utf-8')).hexdigest()[:12]
+        return f"{self.render_variant()}-g{group_key}"
+    
+    def render_variant(self):
+        """Идентификатор версии и настроек рендера для ключей кэша"""
+        return f"{RENDER_VERSION}-p{self.page_height or 0}-{self.color_mode}-{self.encoder.variant()}"
+    
+    def worker_options(self):
+        """Настройки для копии обработчика в дочернем процессе"""
+        return {
+            'docx_engine': self.docx_engine,
+            'xml_engine': self.xml_engine,
+            'page_height': self.page_height,
+            'encoder': self.encoder,
+            'color_mode': self.color_mode,
+        }
+    
     def convert_to_image(self, file_path):
         """Конвертация файла в изображение"""
         if file_path.lower().endswith('.docx'):
@@ -458,4 +557,43 @@ class ImageProcessor:
             return self.xml_to_image(file_path)
         return None
 
+_worker_processor = None
+
+def create_render_pool(workers, font_state, options=None):
+    """Общий пул процессов рендера
+    
+    Процессы создаются через forkserver (или spawn, где его нет), а не
+    fork многопоточного процесса бота. Сервер заранее загружает этот модуль,
+    но каждый процесс пула еще импортирует главный скрипт как __mp_main__,
+    поэтому в главном скрипте не должно быть кода вне проверки __name__.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload([__name__])
+    else:
+        context = multiprocessing.get_context('spawn')
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                               initializer=init_render_worker, initargs=(font_state, options))
+
+def init_render_worker(font_state, options=None):
+    """Инициализация дочернего процесса пула рендера"""
+    global _worker_processor
+    font_registry.load_state(font_state)
+    _worker_processor = ImageProcessor(**(options or {}))
+
+def get_worker_processor():
+    global _worker_processor
+    if _worker_processor is None:
+        _worker_processor = ImageProcessor()
+    return _worker_processor
+
+def render_file_in_worker(file_path):
+    """Рендер файла в дочернем процессе пула, возвращает страницы и сведения о кодировании"""
+    stats = []
+    pages = get_worker_processor().render_file(file_path, stats)
+    return pages, stats
 
+def render_layout_in_worker(layout):
+    """Отрисовка и кодирование одной страницы в дочернем процессе пула"""
+    processor = get_worker_processor()
+    return processor.encode_page(processor.draw_layout(layout))
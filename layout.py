@@ -0,0 +1,37 @@
+CELL_LINE_HEIGHT = 12
+CELL_PADDING = 6
+MAX_CELL_LINES = 5
+COMPACT_ROW_HEIGHT = 22
+
+class TableLayout:
+    """Размещённая таблица: ширины колонок, высоты строк и строки текста ячеек"""
+
+    def __init__(self, x, y, col_widths, row_heights, cell_lines):
+        self.x = x
+        self.y = y
+        self.col_widths = col_widths
+        self.row_heights = row_heights
+        self.cell_lines = cell_lines
+
+    @property
+    def width(self):
+        return sum(self.col_widths)
+
+    @property
+    def height(self):
+        return sum(self.row_heights)
+
+class DocumentLayout:
+    """Размещённый документ, готовый к отрисовке
+
+    text_lines - строки текста вне таблиц в виде (x, y, текст),
+    tables - список TableLayout с абсолютными координатами.
+    """
+
+    def __init__(self, width, height, text_lines, tables, margin=0, line_height=0):
+        self.width = width
+        self.height = height
+        self.text_lines = text_lines
+        self.tables = tables
+        self.margin = margin
+        self.line_height = line_height
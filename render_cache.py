@@ -0,0 +1,183 @@
+import os
+import struct
+import threading
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+PAGES_MAGIC = b'RPG1'
+
+def pack_pages(pages):
+    """Упаковка страниц изображения в один блок для дискового кэша"""
+    header = PAGES_MAGIC + struct.pack(f'<I{len(pages)}Q', len(pages), *(len(page) for page in pages))
+    return header + b''.join(pages)
+
+def unpack_pages(data):
+    """Распаковка страниц, записанных pack_pages"""
+    if data[:4] != PAGES_MAGIC:
+        raise ValueError("неизвестный формат записи кэша")
+    count, = struct.unpack_from('<I', data, 4)
+    sizes = struct.unpack_from(f'<{count}Q', data, 8)
+    pages = []
+    offset = 8 + 8 * count
+    for size in sizes:
+        pages.append(data[offset:offset + size])
+        offset += size
+    if offset != len(data):
+        raise ValueError("повреждённая запись кэша")
+    return pages
+
+class RenderCache:
+    """Кэш готовых изображений расписания по хэшу содержимого файла
+
+    Значение - список закодированных страниц изображения.
+    Два уровня: LRU в памяти и каталог на диске с ограничением по размеру.
+    Ключ строится из хэша файла и версии рендерера, поэтому каждая версия
+    расписания рендерится и кодируется один раз, сколько бы чатов её ни получало.
+    """
+
+    def __init__(self, cache_dir='render_cache', memory_limit=64 * 1024 * 1024, disk_limit=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.memory_limit = memory_limit
+        self.disk_limit = disk_limit
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._disk = OrderedDict()
+        self._disk_size = 0
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.init_disk()
+
+    def init_disk(self):
+        """Загрузка индекса дискового кэша"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            entries = []
+            for entry in os.scandir(self.cache_dir):
+                if entry.is_file() and entry.name.endswith('.bin'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+            for _, key, size in sorted(entries):
+                self._disk[key] = size
+                self._disk_size += size
+            self._evict_disk()
+        except Exception as e:
+            logger.error(f"Ошибка инициализации кэша изображений: {e}")
+
+    @staticmethod
+    def make_key(file_hash, version):
+        """Ключ кэша для хэша файла и версии рендерера"""
+        return f"{file_hash}-{version}"
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, key + '.bin')
+
+    def _remember(self, key, pages):
+        size = sum(len(page) for page in pages)
+        if size > self.memory_limit:
+            return
+        if key in self._memory:
+            self._memory_size -= sum(len(page) for page in self._memory.pop(key))
+        self._memory[key] = pages
+        self._memory_size += size
+        while self._memory_size > self.memory_limit:
+            _, old_pages = self._memory.popitem(last=False)
+            self._memory_size -= sum(len(page) for page in old_pages)
+
+    def _evict_disk(self):
+        while self._disk_size > self.disk_limit and self._disk:
+            old_key, old_size = self._disk.popitem(last=False)
+            self._disk_size -= old_size
+            try:
+                os.remove(self._disk_path(old_key))
+            except OSError:
+                pass
+
+    def contains(self, key):
+        """Проверка наличия изображения в кэше без чтения с диска"""
+        with self._lock:
+            return key in self._memory or key in self._disk
+
+    def get(self, key):
+        """Получение изображения из кэша"""
+        with self._lock:
+            pages = self._memory.get(key)
+            if pages is not None:
+                self._memory.move_to_end(key)
+                return pages
+            if key not in self._disk:
+                return None
+
+        try:
+            path = self._disk_path(key)
+            with open(path, 'rb') as f:
+                pages = unpack_pages(f.read())
+            os.utime(path)
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning(f"Не удалось прочитать кэш изображения {key}: {e}")
+            with self._lock:
+                size = self._disk.pop(key, None)
+                if size is not None:
+                    self._disk_size -= size
+            return None
+
+        with self._lock:
+            if key in self._disk:
+                self._disk.move_to_end(key)
+            self._remember(key, pages)
+        return pages
+
+    def put(self, key, pages):
+        """Сохранение страниц изображения в кэш"""
+        data = pack_pages(pages)
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Ошибка записи кэша изображения {key}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            path = None
+
+        with self._lock:
+            self._remember(key, pages)
+            if path:
+                self._disk_size -= self._disk.pop(key, 0)
+                self._disk[key] = len(data)
+                self._disk_size += len(data)
+                self._evict_disk()
+
+    def get_or_render(self, key, render_func):
+        """Получение изображения из кэша или рендер с сохранением
+
+        Параллельные запросы одного ключа ждут единственный рендер.
+        Пустой список страниц тоже сохраняется: так запоминается, что
+        рендерить нечего, например группы нет в файле. None не кэшируется.
+        """
+        pages = self.get(key)
+        if pages is not None:
+            return pages
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        try:
+            with key_lock:
+                pages = self.get(key)
+                if pages is not None:
+                    return pages
+
+                pages = render_func()
+                if pages is not None:
+                    self.put(key, pages)
+                return pages
+        finally:
+            with self._lock:
+                if self._key_locks.get(key) is key_lock and not key_lock.locked():
+                    del self._key_locks[key]
@@ -0,0 +1,1744 @@
+import os
+import zipfile
+import telebot
+import time
+import threading
+from concurrent.futures import as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from functools import lru_cache
+from telebot.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton, InputFile, InputMediaDocument
+import io
+import hashlib
+from database import DatabaseManager
+from image_processor import ImageProcessor, create_render_pool, render_file_in_worker
+from image_encoder import image_extension
+from schedule_parser import PARSER_VERSION, parse_schedule_tables, normalize_group_name, iter_table_cells, slice_table
+from schedule_text import format_day, format_week
+from schedule_diff import diff_tables, describe_diff, changed_rows_tables
+from font_registry import font_registry
+from admin_db import AdminManager
+from render_cache import RenderCache
+from schedule_store import ScheduleStore, ManifestChanges
+from schedule_generations import GenerationManager
+from schedule_fetcher import ConditionalFetcher, SpoolBuffer, FETCH_UPDATED, FETCH_NOT_MODIFIED, FETCH_FAILED
+
+import logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BOT_TOKEN = 'TOKEN'
+DOWNLOAD_URL = 'http://docs.vztec.ru/index.php/s/W5yaNali0j7SSDD/download'
+ZIP_FILENAME = 'schedule.zip'
+EXTRACT_FOLDER = 'Расписание'
+TARGET_FOLDERS = ['корпус №1 (ФМПК)', 'корпус №2 (ПТФ)']
+UPDATE_INTERVAL = 60
+MAIN_ADMIN_ID = 123456789
+RENDER_CACHE_FOLDER = 'render_cache'
+STORE_FOLDER = 'schedule_store'
+STORE_KEEP_VERSIONS = 20
+GENERATIONS_FOLDER = 'schedule_generations'
+FETCH_STATE_FILE = 'fetch_state.json'
+# Сколько секунд доверять сравнению размера, если сервер не отдает ETag и Last-Modified
+FETCH_HEAD_MAX_AGE = 600
+ARCHIVE_IN_MEMORY = True
+ARCHIVE_SPOOL_THRESHOLD = 32 * 1024 * 1024
+RENDER_CACHE_MEMORY_LIMIT = 64 * 1024 * 1024
+RENDER_CACHE_DISK_LIMIT = 512 * 1024 * 1024
+RENDER_WORKERS = os.cpu_count() or 1
+RENDER_PAGE_HEIGHT = 2400
+# 'RGB', 'L' (оттенки серого) или '1' (черно-белый без сглаживания)
+RENDER_COLOR_MODE = 'L'
+SCHEDULE_TEXT_CACHE_SIZE = 1024
+TELEGRAM_MESSAGE_LIMIT = 4000
+TELEGRAM_MEDIA_GROUP_LIMIT = 10
+UPLOAD_PAUSE = 1.0
+FIND_RESULTS_LIMIT = 20
+# Больше измененных строк - рассылается весь документ
+DIFF_MAX_ROWS = 15
+
+db_manager = DatabaseManager()
+image_processor = ImageProcessor(page_height=RENDER_PAGE_HEIGHT,
+                                 color_mode=RENDER_COLOR_MODE)
+admin_manager = AdminManager()
+render_cache = RenderCache(RENDER_CACHE_FOLDER, RENDER_CACHE_MEMORY_LIMIT, RENDER_CACHE_DISK_LIMIT)
+schedule_store = ScheduleStore(STORE_FOLDER, STORE_KEEP_VERSIONS)
+schedule_generations = GenerationManager(EXTRACT_FOLDER, GENERATIONS_FOLDER)
+schedule_update_lock = threading.Lock()
+render_pool = None
+render_pool_lock = threading.Lock()
+schedule_fetcher = ConditionalFetcher(FETCH_STATE_FILE, FETCH_HEAD_MAX_AGE)
+bot = telebot.TeleBot(BOT_TOKEN)
+
+admin_states = {}
+
+BUILDING_FOLDERS = {1: 'корпус №1 (ФМПК)', 2: 'корпус №2 (ПТФ)'}
+BUILDING_KEYWORDS = {1: ['корпус 1', 'фмпк', 'корпус№1'], 2: ['корпус 2', 'птф', 'корпус№2']}
+
+def folder_building(dir_name):
+    """Номер корпуса по названию папки или None"""
+    lower_dir = dir_name.lower()
+    for building, keywords in BUILDING_KEYWORDS.items():
+        if lower_dir == BUILDING_FOLDERS[building].lower() or any(keyword in lower_dir for keyword in keywords):
+            return building
+    return None
+
+def find_schedule_folder(base_path, building=1):
+    """Поиск папки с расписанием для конкретного корпуса"""
+    if not os.path.exists(base_path):
+        return None
+    
+    target_folder = BUILDING_FOLDERS.get(building)
+    
+    if target_folder:
+        potential_path = os.path.join(base_path, target_folder)
+        if os.path.exists(potential_path) and os.path.isdir(potential_path):
+            return potential_path
+    
+    for root, dirs, files in os.walk(base_path):
+        for dir_name in dirs:
+            lower_dir = dir_name.lower()
+            if any(keyword in lower_dir for keyword in BUILDING_KEYWORDS.get(building, [])):
+                return os.path.join(root, dir_name)
+    
+    return None
+
+def download_file(url, destination, force=False):
+    """Скачивание файла по URL, если он изменился с прошлой загрузки
+    
+    destination - путь к файлу или открытый файловый объект, например
+    буфер в памяти; объект перезаписывается с начала и после загрузки
+    перематывается. Возвращает FETCH_UPDATED, FETCH_NOT_MODIFIED или
+    FETCH_FAILED.
+    """
+    try:
+        if hasattr(destination, 'write'):
+            destination.seek(0)
+            destination.truncate()
+            status = schedule_fetcher.fetch(url, destination, force)
+            if status == FETCH_UPDATED:
+                logger.info(f"Архив загружен в буфер: {destination.tell()} байт")
+            destination.seek(0)
+            return status
+        
+        with open(destination + '.part', 'wb') as f:
+            status = schedule_fetcher.fetch(url, f, force)
+        if status == FETCH_UPDATED:
+            os.replace(destination + '.part', destination)
+        else:
+            os.remove(destination + '.part')
+        return status
+    except Exception as e:
+        logger.error(f"Ошибка при скачивании: {e}")
+        return FETCH_FAILED
+
+def archive_member_path(member_name, extract_to):
+    """Путь файла архива относительно папки расписания или None, если он вне ее"""
+    parts = [part for part in member_name.replace('\\', '/').split('/') if part not in ('', '.')]
+    if not parts or parts[0] != extract_to or '..' in parts or len(parts) < 2:
+        return None
+    return '/'.join(parts[1:])
+
+def archive_member_building(relative_path):
+    """Номер корпуса по папкам пути файла архива или None"""
+    return next((folder_building(part) for part in relative_path.split('/')[:-1]
+                 if folder_building(part)), None)
+
+def extract_zip(archive, extract_to):
+    """Инкрементальная распаковка ZIP архива в хранилище и новое поколение папки
+    
+    CRC32 и размер каждого файла из оглавления архива сравниваются с
+    прошлым манифестом: совпавшие файлы не читаются и не хэшируются, их
+    хэш берется из манифеста. Новое поколение собирается из жестких ссылок
+    на blob'ы и публикуется атомарной заменой ссылки extract_to, поэтому
+    читатели никогда не видят наполовину записанную папку. archive - путь
+    к файлу или файловый объект. Возвращает ManifestChanges или None при
+    ошибке.
+    """
+    try:
+        upgrade_schedule_hashes()
+        previous = schedule_store.load_manifest()['files']
+        with zipfile.ZipFile(archive, 'r') as zip_ref:
+            files, extracted = schedule_store.read_archive(
+                zip_ref, previous, lambda member_name: archive_member_path(member_name, extract_to),
+                archive_member_building)
+        
+        if not files:
+            logger.error(f"В архиве нет файлов в папке {extract_to}")
+            return None
+        
+        changes = ManifestChanges(previous, files)
+        logger.info(f"Распаковано {extracted} из {len(files)} файлов архива: {changes}")
+        version = schedule_store.save_manifest(files)
+        if not changes and schedule_generations.current():
+            return changes
+        
+        generation = schedule_generations.begin(version)
+        try:
+            written, _ = schedule_store.materialize(generation, version)
+        except Exception:
+            schedule_generations.abandon(generation)
+            raise
+        schedule_generations.publish(generation)
+        logger.info(f"Опубликовано поколение расписания {version}: {written} файлов")
+        schedule_store.collect_garbage()
+        db_manager.prune_file_fingerprints()
+        
+        return changes
+    except Exception as e:
+        logger.error(f"Ошибка при распаковке: {e}")
+        return None
+
+def upgrade_schedule_hashes():
+    """Перевод хранилища и базы на новый алгоритм хэша без мнимых изменений файлов"""
+    mapping = schedule_store.upgrade_hashes()
+    if not mapping:
+        return
+    db_manager.replace_file_hashes(mapping)
+    version = schedule_store.load_manifest()['version']
+    generation = schedule_generations.begin(version)
+    try:
+        schedule_store.materialize(generation, version)
+    except Exception:
+        schedule_generations.abandon(generation)
+        raise
+    schedule_generations.publish(generation)
+
+def schedule_file_hashes(schedule_folder, schedule_root=EXTRACT_FOLDER):
+    """Хэши файлов папки корпуса из манифеста ее поколения, без чтения самих файлов"""
+    try:
+        folder = os.path.relpath(schedule_folder, schedule_root).replace(os.sep, '/')
+        version = GenerationManager.generation_number(schedule_root)
+        if version is None:
+            version = GenerationManager.generation_number(schedule_generations.current())
+        if version is None or version not in schedule_store.versions():
+            return {}
+        return schedule_store.folder_hashes(folder, version)
+    except Exception as e:
+        logger.error(f"Ошибка чтения манифеста расписания: {e}")
+        return {}
+
+def get_schedule_files(building=1, schedule_root=EXTRACT_FOLDER):
+    """Получение списка файлов расписания для конкретного корпуса"""
+    if not os.path.exists(schedule_root):
+        return []
+    
+    schedule_folder = find_schedule_folder(schedule_root, building)
+    
+    if not schedule_folder:
+        return []
+    
+    schedule_files = []
+    
+    for file in os.listdir(schedule_folder):
+        file_path = os.path.join(schedule_folder, file)
+        if os.path.isfile(file_path) and (file.lower().endswith('.docx') or file.lower().endswith('.xml')):
+            schedule_files.append(file)
+    
+    return sorted(schedule_files)
+
+def create_building_keyboard():
+    """Создание клавиатуры для выбора корпуса"""
+    keyboard = InlineKeyboardMarkup()
+    keyboard.add(
+        InlineKeyboardButton("🏢 Корпус №1 (ФМПК)", callback_data='building_1'),
+        InlineKeyboardButton("🏫 Корпус №2 (ПТФ)", callback_data='building_2')
+    )
+    return keyboard
+
+def create_files_keyboard(building=1):
+    """Создание клавиатуры с названиями файлов для конкретного корпуса"""
+    files = get_schedule_files(building)
+    keyboard = ReplyKeyboardMarkup(resize_keyboard=True, row_width=2)
+    
+    if files:
+        buttons = [KeyboardButton(file) for file in files]
+        keyboard.add(*buttons)
+    
+    keyboard.add(KeyboardButton("🔄 Обновить список"))
+    
+    keyboard.add(KeyboardButton("🏢 Сменить корпус"))
+    
+    return keyboard
+
+def create_admin_keyboard():
+    """Создание клавиатуры для админов"""
+    keyboard = ReplyKeyboardMarkup(resize_keyboard=True, row_width=2)
+    keyboard.add(
+        KeyboardButton("📊 Статистика"),
+        KeyboardButton("📢 Отправить всем"),
+        KeyboardButton("🔄 Обновить расписание"),
+        KeyboardButton("❌ Выйти из админ-панели")
+    )
+    return keyboard
+
+def send_documents(chat_id, documents):
+    """Отправка страниц альбомами по TELEGRAM_MEDIA_GROUP_LIMIT с паузой между ними
+    
+    documents - file_id или InputFile, возвращает отправленные сообщения.
+    """
+    messages = []
+    for start in range(0, len(documents), TELEGRAM_MEDIA_GROUP_LIMIT):
+        if start:
+            time.sleep(UPLOAD_PAUSE)
+        chunk = documents[start:start + TELEGRAM_MEDIA_GROUP_LIMIT]
+        if len(chunk) == 1:
+            messages.append(bot.send_document(chat_id, chunk[0]))
+        else:
+            messages.extend(bot.send_media_group(chat_id, [InputMediaDocument(document) for document in chunk]))
+    return messages
+
+def file_id_variant(variant, name):
+    """Вариант для file_id Telegram с учетом имени отправленного файла
+    
+    Документ по file_id приходит с тем именем, с которым был загружен,
+    поэтому одинаковые по содержимому файлы с разными именами загружаются
+    отдельно.
+    """
+    return f"{variant}-n{hashlib.sha1(name.encode('utf-8')).hexdigest()[:12]}"
+
+def send_cached_document(chat_id, file_hash, variant, name):
+    """Отправка ранее загруженного документа с именем name по file_id Telegram"""
+    variant = file_id_variant(variant, name)
+    file_ids = db_manager.get_telegram_file_ids(file_hash, variant)
+    if not file_ids:
+        return False
+    
+    try:
+        send_documents(chat_id, file_ids)
+        return True
+    except telebot.apihelper.ApiTelegramException as e:
+        if e.error_code == 400 and 'file' in str(e.description).lower():
+            logger.warning(f"file_id для {file_hash} недействителен, файл будет загружен заново: {e}")
+            db_manager.delete_telegram_file_id(file_hash, variant)
+            return False
+        raise
+
+def upload_document(chat_id, document, file_hash, variant, visible_file_name=None, page=0, pages=1):
+    """Загрузка документа с сохранением выданного Telegram file_id под вариантом из file_id_variant"""
+    message = bot.send_document(chat_id, document, visible_file_name=visible_file_name)
+    if file_hash and message and message.document:
+        db_manager.save_telegram_file_id(file_hash, variant, message.document.file_id, page, pages)
+
+def render_pages(file_hash, variant, render_func):
+    """Страницы изображения из кэша рендера или свежий рендер"""
+    encoding_stats = []
+    if file_hash:
+        cache_key = RenderCache.make_key(file_hash, variant)
+        pages = render_cache.get_or_render(cache_key, lambda: render_func(encoding_stats))
+    else:
+        pages = render_func(encoding_stats)
+    
+    if file_hash and encoding_stats:
+        record_encoding_stats(file_hash, variant, encoding_stats)
+    return pages
+
+def upload_pages(chat_id, pages, base_name, file_hash, variant):
+    """Загрузка страниц изображения альбомами с нумерацией в имени файла"""
+    variant = file_id_variant(variant, base_name)
+    if len(pages) == 1:
+        upload_document(chat_id, io.BytesIO(pages[0]), file_hash, variant, base_name + image_extension(pages[0]))
+        return
+    
+    documents = [InputFile(io.BytesIO(image_data),
+                           file_name=f"{base_name} ({page + 1} из {len(pages)}){image_extension(image_data)}")
+                 for page, image_data in enumerate(pages)]
+    messages = send_documents(chat_id, documents)
+    if file_hash:
+        for page, message in enumerate(messages):
+            if message and message.document:
+                db_manager.save_telegram_file_id(file_hash, variant, message.document.file_id, page, len(pages))
+
+def send_file_to_user(chat_id, file_path, filename, file_hash=None, study_group=None):
+    """Отправка файла пользователю с оптимизацией размера
+    
+    Если указана учебная группа и она есть в файле, отправляются только
+    колонки этой группы.
+    """
+    try:
+        if file_hash is None:
+            file_hash = db_manager.get_file_hash(file_path)
+        base_name = os.path.splitext(filename)[0]
+        
+        if study_group:
+            variant = image_processor.group_variant(study_group)
+            group_file_name = f"{base_name} - {study_group}"
+            if file_hash and send_cached_document(chat_id, file_hash, variant, group_file_name):
+                return
+            pages = render_pages(file_hash, variant,
+                                 lambda stats: image_processor.render_group_file(file_path, study_group, stats))
+            if pages:
+                upload_pages(chat_id, pages, group_file_name, file_hash, variant)
+                return
+        
+        variant = image_processor.render_variant()
+        if file_hash and send_cached_document(chat_id, file_hash, variant, base_name):
+            return
+        
+        pages = render_pages(file_hash, variant,
+                             lambda stats: image_processor.render_file(file_path, stats))
+        if pages:
+            upload_pages(chat_id, pages, base_name, file_hash, variant)
+        else:
+            if file_hash and send_cached_document(chat_id, file_hash, 'original', filename):
+                return
+            with open(file_path, 'rb') as f:
+                upload_document(chat_id, f, file_hash, file_id_variant('original', filename), filename)
+                
+    except Exception as e:
+        logger.error(f"Ошибка отправки файла пользователю {chat_id}: {e}")
+
+def prepare_file_diff(filename, old_hash, new_hash, group_name=None):
+    """Изменения таблиц файла между версиями или None, если нужен весь документ
+    
+    С group_name сравниваются только колонки этой группы; если группы нет в
+    файле, возвращается None. Если изменения не коснулись группы, список
+    строк пуст.
+    """
+    old_tables = db_manager.get_schedule_tables(old_hash) if old_hash else None
+    new_tables = db_manager.get_schedule_tables(new_hash) if new_hash else None
+    if old_tables is None or new_tables is None:
+        return None
+    
+    if group_name:
+        old_tables = [slice_table(table, group_name) or [] for table in old_tables]
+        new_tables = [slice_table(table, group_name) or [] for table in new_tables]
+        if not any(new_tables) or not any(old_tables):
+            return None
+    
+    diff = diff_tables(old_tables, new_tables)
+    if group_name and not diff:
+        return {'old_hash': old_hash, 'group': group_name, 'lines': [], 'tables': []}
+    if not diff or diff.shape_changed or diff.row_count > DIFF_MAX_ROWS:
+        return None
+    
+    logger.info(f"Изменения в {filename}{f' для группы {group_name}' if group_name else ''}: "
+                f"{len(diff.changed_cells)} ячеек, "
+                f"{len(diff.added_rows)} новых и {len(diff.removed_rows)} удаленных строк")
+    return {
+        'old_hash': old_hash,
+        'group': group_name,
+        'lines': describe_diff(diff, old_tables, new_tables),
+        'tables': changed_rows_tables(diff, new_tables),
+    }
+
+def send_file_diff(chat_id, filename, file_hash, file_diff):
+    """Отправка сообщения об изменениях и изображения только измененных строк"""
+    try:
+        base_name = os.path.splitext(filename)[0]
+        group_name = file_diff.get('group')
+        if not file_diff['lines']:
+            bot.send_message(chat_id, f"✏️ В {filename} нет изменений для группы {group_name}")
+            return
+        title = f"✏️ Изменения в {filename}" + (f" для группы {group_name}" if group_name else '')
+        for chunk in split_message(f"{title}:\n" + "\n".join(file_diff['lines'])):
+            bot.send_message(chat_id, chunk)
+        
+        if not file_diff['tables']:
+            return
+        if group_name:
+            variant = f"{image_processor.group_variant(group_name)}-d{file_diff['old_hash'][:12]}"
+        else:
+            variant = f"{image_processor.render_variant()}-d{file_diff['old_hash'][:12]}"
+        diff_name = f"{base_name} - изменения"
+        if send_cached_document(chat_id, file_hash, variant, diff_name):
+            return
+        pages = render_pages(file_hash, variant,
+                             lambda stats: image_processor.render_tables(f"Изменения: {base_name}",
+                                                                         file_diff['tables'], stats))
+        if pages:
+            upload_pages(chat_id, pages, diff_name, file_hash, variant)
+    except Exception as e:
+        logger.error(f"Ошибка отправки изменений пользователю {chat_id}: {e}")
+
+def record_encoding_stats(file_hash, variant, stats):
+    """Сохранение и логирование выбранных форматов страниц файла"""
+    size = sum(info['size'] for info in stats)
+    jpeg_size = sum(info['jpeg_size'] for info in stats)
+    formats = ', '.join(info['format'] for info in stats)
+    logger.info(f"Кодирование {file_hash}: {formats}, {size} байт вместо {jpeg_size} в JPEG")
+    db_manager.save_encoding_stats(file_hash, variant, stats)
+
+def prerender_files(files):
+    """Параллельный рендер изменённых файлов перед рассылкой"""
+    variant = image_processor.render_variant()
+    pending = []
+    for file_path, file_hash in files:
+        if not file_hash:
+            continue
+        cache_key = RenderCache.make_key(file_hash, variant)
+        base_name = os.path.splitext(os.path.basename(file_path))[0]
+        if render_cache.contains(cache_key) or db_manager.get_telegram_file_ids(file_hash, file_id_variant(variant, base_name)):
+            continue
+        pending.append((file_path, file_hash, cache_key))
+    
+    if not pending:
+        return
+    
+    logger.info(f"Предварительный рендер {len(pending)} файлов...")
+    try:
+        executor = get_render_pool()
+        futures = {executor.submit(render_file_in_worker, file_path): (file_path, file_hash, cache_key)
+                   for file_path, file_hash, cache_key in pending}
+        for future in as_completed(futures):
+            file_path, file_hash, cache_key = futures[future]
+            try:
+                pages, encoding_stats = future.result()
+                if pages:
+                    render_cache.put(cache_key, pages)
+                if encoding_stats:
+                    record_encoding_stats(file_hash, variant, encoding_stats)
+            except BrokenProcessPool:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка предварительного рендера {file_path}: {e}")
+    except BrokenProcessPool as e:
+        logger.error(f"Пул рендера остановился и будет создан заново: {e}")
+        image_processor.executor = None
+    except Exception as e:
+        logger.error(f"Ошибка пула рендера: {e}")
+
+def get_render_pool():
+    """Общий пул процессов рендера для предварительного рендера и страниц
+    
+    Пул создается один раз и передается image_processor; если пул
+    сломался, создается новый.
+    """
+    global render_pool
+    with render_pool_lock:
+        if render_pool is None or image_processor.executor is not render_pool:
+            if render_pool is not None:
+                render_pool.shutdown(wait=False)
+            render_pool = create_render_pool(RENDER_WORKERS, font_registry.export_state(),
+                                             image_processor.worker_options())
+            image_processor.executor = render_pool
+        return render_pool
+
+SCHEDULE_CHANGED = 'changed'
+SCHEDULE_UNCHANGED = 'unchanged'
+
+def download_and_extract(force=False):
+    """Загрузка архива и распаковка нового поколения, возвращает (статус, изменения) как update_schedule"""
+    if ARCHIVE_IN_MEMORY:
+        archive = SpoolBuffer(ARCHIVE_SPOOL_THRESHOLD)
+    else:
+        archive = ZIP_FILENAME
+    
+    try:
+        status = download_file(DOWNLOAD_URL, archive, force)
+        if status == FETCH_NOT_MODIFIED and os.path.exists(EXTRACT_FOLDER):
+            logger.info("Архив расписания не изменился")
+            return SCHEDULE_UNCHANGED, None
+        if status == FETCH_NOT_MODIFIED:
+            status = download_file(DOWNLOAD_URL, archive, force=True)
+        
+        if status == FETCH_UPDATED:
+            changes = extract_zip(archive, EXTRACT_FOLDER)
+            if changes is not None:
+                schedule_fetcher.commit(DOWNLOAD_URL)
+                if not ARCHIVE_IN_MEMORY:
+                    try:
+                        os.remove(ZIP_FILENAME)
+                    except:
+                        pass
+                if not changes:
+                    logger.info("Файлы в новом архиве не изменились")
+                    return SCHEDULE_UNCHANGED, changes
+                logger.info("Расписание успешно обновлено")
+                return SCHEDULE_CHANGED, changes
+            schedule_fetcher.discard(DOWNLOAD_URL)
+        return None, None
+    finally:
+        if ARCHIVE_IN_MEMORY:
+            archive.close()
+
+def update_schedule(force=False):
+    """Обновление расписания
+    
+    Возвращает пару (статус, изменения): SCHEDULE_CHANGED, если в новом
+    архиве изменились файлы, SCHEDULE_UNCHANGED, если архив или его файлы
+    не менялись, и None при ошибке; изменения - ManifestChanges распаковки
+    или None, если архив не распаковывался.
+    После любого успешного обновления разбираются еще не разобранные файлы
+    всех корпусов, чтобы текстовые ответы и поиск работали и без изменений
+    на сервере. Одновременные обновления из фонового потока и команд
+    выполняются по очереди. При ARCHIVE_IN_MEMORY архив не записывается на
+    диск, пока его размер не превысит ARCHIVE_SPOOL_THRESHOLD.
+    """
+    with schedule_update_lock:
+        logger.info("Начало обновления расписания...")
+        status, changes = download_and_extract(force)
+        if status is not None:
+            try:
+                ingest_all_schedules()
+            except Exception as e:
+                logger.error(f"Ошибка разбора расписания: {e}")
+        return status, changes
+
+def ingest_schedule_files(schedule_folder, current_files, building, schedule_root=EXTRACT_FOLDER):
+    """Разбор таблиц новых файлов в записи занятий и индекс поиска, возвращает хэши файлов"""
+    parsed_hashes = db_manager.get_parsed_schedule_hashes(PARSER_VERSION)
+    manifest_hashes = schedule_file_hashes(schedule_folder, schedule_root)
+    missing_paths = [os.path.join(schedule_folder, filename) for filename in current_files
+                     if filename not in manifest_hashes]
+    fingerprint_hashes = db_manager.get_file_hashes(missing_paths) if missing_paths else {}
+    file_hashes = {}
+    
+    for filename in current_files:
+        file_path = os.path.join(schedule_folder, filename)
+        if not os.path.exists(file_path):
+            continue
+        file_hash = manifest_hashes.get(filename) or fingerprint_hashes.get(file_path)
+        file_hashes[filename] = file_hash
+        if not file_hash or file_hash in parsed_hashes:
+            continue
+        
+        try:
+            tables = image_processor.extract_tables(file_path)
+            entries = parse_schedule_tables(tables, filename)
+            cells = [(table_index,) + cell for table_index, table in enumerate(tables)
+                     for cell in iter_table_cells(table)]
+            db_manager.save_schedule_entries(file_hash, entries, cells, PARSER_VERSION)
+            db_manager.save_schedule_tables(file_hash, tables)
+            parsed_hashes.add(file_hash)
+            logger.info(f"Разобрано {len(entries)} занятий из {filename}")
+        except Exception as e:
+            logger.error(f"Ошибка разбора расписания {filename}: {e}")
+    
+    db_manager.update_schedule_sources(building, file_hashes)
+    return file_hashes
+
+def ingest_all_schedules():
+    """Разбор файлов всех корпусов, уже разобранные файлы пропускаются"""
+    with schedule_generations.pin() as schedule_root:
+        for building in BUILDING_FOLDERS:
+            schedule_folder = find_schedule_folder(schedule_root, building)
+            if not schedule_folder:
+                continue
+            current_files = get_schedule_files(building, schedule_root)
+            if current_files:
+                ingest_schedule_files(schedule_folder, current_files, building, schedule_root)
+
+def check_building_files(current_building, schedule_root, chat_id=None, building=None):
+    """Проверка файлов одного корпуса и рассылка новых и измененных
+    
+    Возвращает отправленные файлы как кортежи (имя, путь, хэш, корпус).
+    """
+    schedule_folder = find_schedule_folder(schedule_root, current_building)
+    if not schedule_folder:
+        logger.warning(f"Папка с расписанием для корпуса {current_building} не найдена")
+        if chat_id and (building == current_building or building is None):
+            bot.send_message(chat_id, f"❌ Папка с расписанием для корпуса {current_building} не найдена")
+        return []
+    
+    current_files = get_schedule_files(current_building, schedule_root)
+    
+    if not current_files:
+        logger.warning(f"Не найдено файлов расписания для корпуса {current_building}.")
+        if chat_id and (building == current_building or building is None):
+            bot.send_message(chat_id, f"❌ Файлы расписания для корпуса {current_building} не найдены")
+        return []
+    
+    file_hashes = ingest_schedule_files(schedule_folder, current_files, current_building, schedule_root)
+    known_files = db_manager.get_known_files(current_building)
+    
+    if chat_id:
+        user_building = db_manager.get_user_building(chat_id)
+        if user_building == current_building:
+            users = {chat_id: False}
+            send_to_all = False
+        else:
+            users = {}
+            send_to_all = False
+    else:
+        users = db_manager.get_users_by_building(current_building)
+        send_to_all = True
+    
+    if not users:
+        logger.info(f"Нет пользователей для корпуса {current_building} для отправки уведомлений")
+        return []
+    
+    user_groups = db_manager.get_user_groups(current_building)
+    new_files = []
+    updated_files = []
+    
+    for filename in current_files:
+        file_path = os.path.join(schedule_folder, filename)
+        if os.path.exists(file_path):
+            current_hash = file_hashes.get(filename)
+            
+            if filename not in known_files:
+                new_files.append((filename, file_path, current_hash))
+                logger.info(f"Обнаружен новый файл для корпуса {current_building}: {filename}")
+            elif known_files[filename] != current_hash:
+                updated_files.append((filename, file_path, current_hash))
+                logger.info(f"Файл изменен для корпуса {current_building}: {filename}")
+    
+    files_to_send = new_files + updated_files
+    
+    if files_to_send:
+        logger.info(f"Найдено {len(files_to_send)} файлов для отправки для корпуса {current_building}")
+        
+        file_diffs = {}
+        group_diffs = {}
+        for filename, file_path, file_hash in updated_files:
+            file_diff = prepare_file_diff(filename, known_files[filename], file_hash)
+            if file_diff:
+                file_diffs[filename] = file_diff
+        
+        prerender_files([(file_path, file_hash) for filename, file_path, file_hash in files_to_send
+                         if filename not in file_diffs])
+        
+        building_name = "Корпус №1 (ФМПК)" if current_building == 1 else "Корпус №2 (ПТФ)"
+        
+        if new_files:
+            new_files_names = [f[0] for f in new_files]
+            new_files_text = "\n".join([f"• {name}" for name in new_files_names])
+            message_text = f"📥 Новые файлы расписания ({building_name}):\n{new_files_text}"
+        else:
+            message_text = f"📝 Обновленные файлы расписания ({building_name}):"
+        
+        if updated_files:
+            updated_files_names = [f[0] for f in updated_files]
+            updated_files_text = "\n".join([f"• {name}" for name in updated_files_names])
+            message_text += f"\n\n🔄 Обновленные файлы:\n{updated_files_text}"
+        
+        for user_id, is_group in users.items():
+            try:
+                if send_to_all or user_id == chat_id:
+                    bot.send_message(user_id, message_text)
+                
+                study_group = user_groups.get(user_id)
+                for filename, file_path, file_hash in files_to_send:
+                    file_diff = file_diffs.get(filename)
+                    if file_diff and study_group:
+                        group_key = (filename, normalize_group_name(study_group))
+                        if group_key not in group_diffs:
+                            group_diffs[group_key] = prepare_file_diff(
+                                filename, known_files[filename], file_hash, study_group)
+                        # Если изменения группы не описать построчно, отправляются ее колонки или весь документ
+                        file_diff = group_diffs[group_key]
+                    if file_diff:
+                        send_file_diff(user_id, filename, file_hash, file_diff)
+                    else:
+                        send_file_to_user(user_id, file_path, filename, file_hash, study_group)
+                    time.sleep(0.1)
+                
+            except Exception as e:
+                logger.error(f"Ошибка отправки пользователю {user_id}: {e}")
+        
+        for filename, file_path, file_hash in files_to_send:
+            if file_hash:
+                db_manager.save_file_info(filename, file_hash, current_building)
+        
+        db_manager.cleanup_old_files(current_files, current_building)
+        
+    else:
+        logger.info(f"Новых или измененных файлов не обнаружено для корпуса {current_building}")
+        if chat_id and (building == current_building or building is None):
+            bot.send_message(chat_id, f"✅ Для корпуса {current_building} новых файлов не обнаружено. Все актуально!")
+    
+    return [(filename, file_path, file_hash, current_building) for filename, file_path, file_hash in files_to_send]
+
+def check_new_files(chat_id=None, building=None, pending=None):
+    """Проверка новых файлов и отправка только новых пользователям
+    
+    pending - множество корпусов с еще не разосланными изменениями, тогда
+    проверяются только они, и корпус удаляется из множества только после
+    его обработки: при сбое рассылки оставшиеся корпуса проверятся в
+    следующий раз. Поколение папки расписания закрепляется до конца
+    рассылки.
+    """
+    with schedule_generations.pin() as schedule_root:
+        logger.info(f"Проверка новых файлов для корпуса {building if building else 'всех'}...")
+        
+        if building is not None:
+            buildings_to_check = [building]
+        elif pending is not None:
+            buildings_to_check = sorted(pending)
+        else:
+            buildings_to_check = [1, 2]
+        
+        all_new_files = []
+        for current_building in buildings_to_check:
+            all_new_files.extend(check_building_files(current_building, schedule_root, chat_id, building))
+            if pending is not None:
+                pending.discard(current_building)
+        return all_new_files
+
+def periodic_update():
+    """Периодическое обновление и проверка файлов
+    
+    Корпуса с изменениями накапливаются, пока их рассылка не завершится.
+    """
+    pending_buildings = set()
+    while True:
+        try:
+            status, changes = update_schedule()
+            if status == SCHEDULE_CHANGED:
+                pending_buildings.update(changes.buildings)
+            if pending_buildings:
+                check_new_files(pending=pending_buildings)
+            time.sleep(UPDATE_INTERVAL)
+        except Exception as e:
+            logger.error(f"Ошибка в periodic_update: {e}")
+            time.sleep(UPDATE_INTERVAL)
+
+@bot.message_handler(commands=['start'])
+def send_welcome(message):
+    """Обработчик команды start"""
+    try:
+        is_group = message.chat.type in ['group', 'supergroup']
+        
+        current_building = db_manager.get_user_building(message.chat.id)
+        
+        if current_building is None:
+            db_manager.add_user(message.chat.id, is_group, 1)
+            keyboard = create_building_keyboard()
+            welcome_text = (
+                "👋 Добро пожаловать в бот расписания!\n\n"
+                "📍 Пожалуйста, выберите ваш корпус:"
+            )
+            bot.send_message(message.chat.id, welcome_text, reply_markup=keyboard)
+        else:
+            db_manager.add_user(message.chat.id, is_group, current_building)
+            
+            schedule_folder = find_schedule_folder(EXTRACT_FOLDER, current_building)
+            if schedule_folder:
+                files = get_schedule_files(current_building)
+                if files:
+                    if is_group:
+                        building_name = "Корпус №1 (ФМПК)" if current_building == 1 else "Корпус №2 (ПТФ)"
+                        welcome_text = (
+                            f"👋 Бот расписания готов к работе!\n\n"
+                            f"📍 Ваш корпус: {building_name}\n"
+                            f"📍 Новые файлы будут автоматически отправляться в эту группу"
+                        )
+                        bot.send_message(message.chat.id, welcome_text)
+                    else:
+                        keyboard = create_files_keyboard(current_building)
+                        building_name = "Корпус №1 (ФМПК)" if current_building == 1 else "Корпус №2 (ПТФ)"
+                        welcome_text = (
+                            f"👋 Добро пожаловать!\n\n"
+                            f"📍 Ваш корпус: {building_name}\n\n"
+                            f"Выберите нужное расписание из списка ниже:\n\n"
+                            f"📁 Доступно файлов: {len(files)}\n"
+                            f"📍 Нажмите на название файла, чтобы получить его\n"
+                            f"🔄 Нажмите 'Обновить список' для проверки новых файлов\n"
+                            f"🏢 Нажмите 'Сменить корпус' для изменения корпуса"
+                        )
+                        bot.send_message(message.chat.id, welcome_text, reply_markup=keyboard)
+                else:
+                    bot.send_message(message.chat.id, "Файлы расписания не найдены")
+            else:
+                bot.send_message(message.chat.id, "Расписание не загружено")
+            
+    except Exception as e:
+        logger.error(f"Ошибка в send_welcome: {e}")
+
+@bot.message_handler(commands=['schedule'])
+def show_schedule_for_groups(message):
+    """Команда для показа расписания обоих корпусов в группах"""
+    try:
+        if message.chat.type not in ['group', 'supergroup']:
+            bot.send_message(message.chat.id, "❌ Эта команда работает только в группах!")
+            return
+        
+        keyboard = InlineKeyboardMarkup(row_width=2)
+        keyboard.add(
+            InlineKeyboardButton("🏢 Корпус №1 (ФМПК)", callback_data='schedule_building_1'),
+            InlineKeyboardButton("🏫 Корпус №2 (ПТФ)", callback_data='schedule_building_2'),
+            InlineKeyboardButton("📋 Оба корпуса", callback_data='schedule_both')
+        )
+        
+        current_building = db_manager.get_user_building(message.chat.id)
+        current_building_name = "Корпус №1 (ФМПК)" if current_building == 1 else "Корпус №2 (ПТФ)"
+        
+        files_1 = get_schedule_files(1)
+        files_2 = get_schedule_files(2)
+        
+        bot.send_message(
+            message.chat.id,
+            f"📅 РАСПИСАНИЕ ДЛЯ ГРУПП\n\n"
+            f"📍 Текущий корпус группы: {current_building_name}\n"
+            f"📁 Доступно файлов:\n"
+            f"• Корпус 1: {len(files_1)} файлов\n"
+            f"• Корпус 2: {len(files_2)} файлов\n\n"
+            f"Выберите, расписание какого корпуса показать:",
+            reply_markup=keyboard
+        )
+            
+    except Exception as e:
+        logger.error(f"Ошибка в show_schedule_for_groups: {e}")
+        bot.send_message(message.chat.id, "❌ Ошибка при выполнении команды!")
+
+@bot.callback_query_handler(func=lambda call: call.data.startswith('schedule_'))
+def handle_schedule_selection(call):
+    """Обработчик выбора расписания для групп"""
+    try:
+        action = call.data.split('_')[1]
+        
+        if action == 'building':
+            building = int(call.data.split('_')[2])
+            send_schedule_files(call.message.chat.id, building, call.message.message_id)
+            
+        elif action == 'both':
+            send_both_buildings_schedule(call.message.chat.id, call.message.message_id)
+            
+    except Exception as e:
+        logger.error(f"Ошибка при выборе расписания: {e}")
+        bot.answer_callback_query(call.id, "❌ Ошибка при загрузке расписания!")
+
+def send_schedule_files(chat_id, building, message_id=None):
+    """Отправка файлов расписания для конкретного корпуса"""
+    try:
+        with schedule_generations.pin() as schedule_root:
+            building_name = "Корпус №1 (ФМПК)" if building == 1 else "Корпус №2 (ПТФ)"
+            schedule_folder = find_schedule_folder(schedule_root, building)
+            
+            if not schedule_folder:
+                bot.send_message(chat_id, f"❌ Папка с расписанием для {building_name} не найдена")
+                return
+            
+            files = get_schedule_files(building, schedule_root)
+            
+            if not files:
+                bot.send_message(chat_id, f"❌ Файлы расписания для {building_name} не найдены")
+                return
+            
+            if message_id:
+                bot.edit_message_text(
+                    chat_id=chat_id,
+                    message_id=message_id,
+                    text=f"📅 Отправляю расписание для {building_name}...",
+                    reply_markup=None
+                )
+            
+            bot.send_message(chat_id, f"📅 РАСПИСАНИЕ {building_name.upper()}:")
+            file_hashes = schedule_file_hashes(schedule_folder, schedule_root)
+            
+            for filename in files:
+                file_path = os.path.join(schedule_folder, filename)
+                if os.path.exists(file_path):
+                    try:
+                        send_file_to_user(chat_id, file_path, filename, file_hashes.get(filename))
+                        time.sleep(0.5)
+                    except Exception as e:
+                        logger.error(f"Ошибка отправки файла {filename}: {e}")
+                        bot.send_message(chat_id, f"❌ Не удалось отправить файл: {filename}")
+            
+            keyboard = InlineKeyboardMarkup()
+            keyboard.add(InlineKeyboardButton("↩️ Вернуться к выбору", callback_data='back_to_schedule_menu'))
+            
+            bot.send_message(
+                chat_id,
+                f"✅ Расписание для {building_name} отправлено!\n"
+                f"Всего файлов: {len(files)}",
+                reply_markup=keyboard
+            )
+            
+    except Exception as e:
+        logger.error(f"Ошибка в send_schedule_files: {e}")
+        bot.send_message(chat_id, "❌ Ошибка при отправке расписания!")
+
+def send_both_buildings_schedule(chat_id, message_id=None):
+    """Отправка расписания для обоих корпусов"""
+    try:
+        if message_id:
+            bot.edit_message_text(
+                chat_id=chat_id,
+                message_id=message_id,
+                text="📅 Отправляю расписание для обоих корпусов...",
+                reply_markup=None
+            )
+        
+        send_schedule_files(chat_id, 1, None)
+        time.sleep(1)
+        
+        send_schedule_files(chat_id, 2, None)
+        
+        keyboard = InlineKeyboardMarkup()
+        keyboard.add(InlineKeyboardButton("↩️ Вернуться к выбору", callback_data='back_to_schedule_menu'))
+        
+        bot.send_message(
+            chat_id,
+            "✅ Расписание для обоих корпусов отправлено!",
+            reply_markup=keyboard
+        )
+            
+    except Exception as e:
+        logger.error(f"Ошибка в send_both_buildings_schedule: {e}")
+        bot.send_message(chat_id, "❌ Ошибка при отправке расписания!")
+
+@bot.callback_query_handler(func=lambda call: call.data == 'back_to_schedule_menu')
+def back_to_schedule_menu(call):
+    """Возврат к меню выбора расписания"""
+    try:
+        show_schedule_for_groups(call.message)
+        
+        try:
+            bot.delete_message(call.message.chat.id, call.message.message_id)
+        except:
+            pass
+            
+    except Exception as e:
+        logger.error(f"Ошибка в back_to_schedule_menu: {e}")
+        bot.answer_callback_query(call.id, "❌ Ошибка при возврате в меню!")
+
+@bot.callback_query_handler(func=lambda call: call.data.startswith('building_'))
+def handle_building_selection(call):
+    """Обработчик выбора корпуса"""
+    try:
+        building = int(call.data.split('_')[1])
+        db_manager.set_user_building(call.message.chat.id, building)
+        
+        building_name = "Корпус №1 (ФМПК)" if building == 1 else "Корпус №2 (ПТФ)"
+        bot.edit_message_text(
+            chat_id=call.message.chat.id,
+            message_id=call.message.message_id,
+            text=f"✅ Выбран {building_name}"
+        )
+        
+        schedule_folder = find_schedule_folder(EXTRACT_FOLDER, building)
+        if schedule_folder:
+            files = get_schedule_files(building)
+            if files:
+                keyboard = create_files_keyboard(building)
+                welcome_text = (
+                    f"👋 Добро пожаловать!\n\n"
+                    f"📍 Ваш корпус: {building_name}\n\n"
+                    f"Выберите нужное расписание из списка ниже:\n\n"
+                    f"📁 Доступно файлов: {len(files)}\n"
+                    f"📍 Нажмите на название файла, чтобы получить его\n"
+                    f"🔄 Нажмите 'Обновить список' для проверки новых файлов\n"
+                    f"🏢 Нажмите 'Сменить корпус' для изменения корпуса"
+                )
+                bot.send_message(call.message.chat.id, welcome_text, reply_markup=keyboard)
+            else:
+                bot.send_message(call.message.chat.id, f"Файлы расписания для {building_name} не найдены")
+        else:
+            bot.send_message(call.message.chat.id, f"Расписание для {building_name} не загружено")
+            
+    except Exception as e:
+        logger.error(f"Ошибка при выборе корпуса: {e}")
+
+@bot.message_handler(func=lambda message: message.text in get_schedule_files(1) + get_schedule_files(2))
+def send_selected_file(message):
+    """Обработчик выбора файла из клавиатуры"""
+    try:
+        if message.chat.type in ['group', 'supergroup']:
+            return
+            
+        filename = message.text
+        building = db_manager.get_user_building(message.chat.id)
+        
+        with schedule_generations.pin() as schedule_root:
+            schedule_folder_1 = find_schedule_folder(schedule_root, 1)
+            schedule_folder_2 = find_schedule_folder(schedule_root, 2)
+            
+            file_path = None
+            file_building = None
+            
+            if schedule_folder_1:
+                potential_path = os.path.join(schedule_folder_1, filename)
+                if os.path.exists(potential_path):
+                    file_path = potential_path
+                    file_building = 1
+            
+            if not file_path and schedule_folder_2:
+                potential_path = os.path.join(schedule_folder_2, filename)
+                if os.path.exists(potential_path):
+                    file_path = potential_path
+                    file_building = 2
+            
+            if file_path:
+                bot.send_message(message.chat.id, f"📄 Отправляю файл: {filename}")
+                file_hash = db_manager.get_file_hash(file_path)
+                send_file_to_user(message.chat.id, file_path, filename, file_hash,
+                                  db_manager.get_user_group(message.chat.id))
+                
+                if file_hash and file_building:
+                    db_manager.save_file_info(filename, file_hash, file_building)
+            else:
+                bot.send_message(message.chat.id, f"❌ Файл {filename} не найден")
+            
+    except Exception as e:
+        logger.error(f"Ошибка при отправке выбранного файла: {e}")
+
+@bot.message_handler(func=lambda message: message.text == "🔄 Обновить список")
+def refresh_files_list(message):
+    """Обработчик обновления списка файлов - с проверкой новых файлов"""
+    try:
+        if message.chat.type in ['group', 'supergroup']:
+            return
+
+        building = db_manager.get_user_building(message.chat.id)
+        building_name = "Корпус №1 (ФМПК)" if building == 1 else "Корпус №2 (ПТФ)"
+
+        bot.send_message(message.chat.id, f"🔄 Обновляю расписание для {building_name}...")
+
+        status, _ = update_schedule()
+        if status:
+            new_files = check_new_files(message.chat.id, building)
+
+            keyboard = create_files_keyboard(building)
+            files = get_schedule_files(building)
+
+            if files:
+                if new_files:
+                    bot.send_message(message.chat.id,
+                                   f"✅ Список обновлен для {building_name}!\n📁 Доступно файлов: {len(files)}",
+                                   reply_markup=keyboard)
+                else:
+                    bot.send_message(message.chat.id,
+                                   f"✅ Расписание обновлено для {building_name}!\n📁 Доступно файлов: {len(files)}\n🔄 Новых файлов не обнаружено",
+                                   reply_markup=keyboard)
+            else:
+                bot.send_message(message.chat.id,
+                               f"❌ Файлы расписания не найдены для {building_name}",
+                               reply_markup=keyboard)
+        else:
+            bot.send_message(message.chat.id, "❌ Не удалось обновить расписание")
+
+    except Exception as e:
+        logger.error(f"Ошибка при обновлении списка файлов: {e}")
+        bot.send_message(message.chat.id, "❌ Ошибка при обновлении списка файлов")
+
+@bot.message_handler(func=lambda message: message.text == "🏢 Сменить корпус")
+def change_building(message):
+    """Обработчик смены корпуса"""
+    try:
+        if message.chat.type in ['group', 'supergroup']:
+            return
+            
+        keyboard = create_building_keyboard()
+        current_building = db_manager.get_user_building(message.chat.id)
+        current_building_name = "Корпус №1 (ФМПК)" if current_building == 1 else "Корпус №2 (ПТФ)"
+        
+        bot.send_message(
+            message.chat.id,
+            f"📍 Ваш текущий корпус: {current_building_name}\n\n"
+            "Выберите новый корпус:",
+            reply_markup=keyboard
+        )
+            
+    except Exception as e:
+        logger.error(f"Ошибка при смене корпуса: {e}")
+        bot.send_message(message.chat.id, "❌ Ошибка при смене корпуса")
+
+@bot.message_handler(commands=['status'])
+def send_status(message):
+    """Обработчик команды status"""
+    try:
+        users = db_manager.get_all_users()
+        users_count = len(users)
+        
+        building_1_users = sum(1 for user_data in users.values() if user_data['building'] == 1)
+        building_2_users = sum(1 for user_data in users.values() if user_data['building'] == 2)
+        
+        group_users_count = sum(1 for user_data in users.values() if user_data['is_group'])
+        personal_users_count = users_count - group_users_count
+        
+        files_1 = get_schedule_files(1)
+        files_2 = get_schedule_files(2)
+        
+        known_files_1 = db_manager.get_known_files(1)
+        known_files_2 = db_manager.get_known_files(2)
+        
+        status_text = (
+            f"📊 Статус бота:\n"
+            f"• Пользователей: {users_count}\n"
+            f"  - Группы: {group_users_count}\n"
+            f"  - Личные чаты: {personal_users_count}\n"
+            f"• По корпусам:\n"
+            f"  - Корпус 1: {building_1_users} пользователей\n"
+            f"  - Корпус 2: {building_2_users} пользователей\n"
+            f"• Файлов расписания:\n"
+            f"  - Корпус 1: {len(files_1)} файлов\n"
+            f"  - Корпус 2: {len(files_2)} файлов\n"
+            f"• Отслеживаемых файлов:\n"
+            f"  - Корпус 1: {len(known_files_1)}\n"
+            f"  - Корпус 2: {len(known_files_2)}\n"
+        )
+        
+        bot.send_message(message.chat.id, status_text)
+        
+    except Exception as e:
+        logger.error(f"Ошибка в send_status: {e}")
+        bot.send_message(message.chat.id, "Ошибка получения статуса")
+
+@bot.message_handler(commands=['college'])
+def set_building_command(message):
+    """Команда для смены корпуса с инлайн-клавиатурой"""
+    try:
+        if message.chat.type not in ['group', 'supergroup']:
+            bot.send_message(message.chat.id, "❌ Эта команда работает только в группах!")
+            return
+        
+        keyboard = InlineKeyboardMarkup()
+        keyboard.add(
+            InlineKeyboardButton("🏢 Корпус №1 (ФМПК)", callback_data='group_building_1'),
+            InlineKeyboardButton("🏫 Корпус №2 (ПТФ)", callback_data='group_building_2')
+        )
+        
+        current_building = db_manager.get_user_building(message.chat.id)
+        current_building_name = "Корпус №1 (ФМПК)" if current_building == 1 else "Корпус №2 (ПТФ)"
+        
+        bot.send_message(
+            message.chat.id,
+            f"📍 Текущий корпус: {current_building_name}\n\n"
+            "Выберите новый корпус для группы:",
+            reply_markup=keyboard
+        )
+            
+    except Exception as e:
+        logger.error(f"Ошибка в set_building_command: {e}")
+        bot.send_message(message.chat.id, "❌ Ошибка при выполнении команды!")
+
+@bot.message_handler(commands=['group'])
+def set_study_group(message):
+    """Выбор учебной группы: /group ИС-21, сброс - /group -"""
+    try:
+        building = db_manager.get_user_building(message.chat.id)
+        if building is None:
+            bot.send_message(message.chat.id, "❌ Сначала выберите корпус командой /start")
+            return
+        
+        known_groups = db_manager.get_schedule_groups(building) or db_manager.get_schedule_groups()
+        parts = message.text.split(maxsplit=1)
+        
+        if len(parts) < 2:
+            current_group = db_manager.get_user_group(message.chat.id)
+            groups_text = ", ".join(known_groups[:60]) if known_groups else "расписание еще не разобрано"
+            bot.send_message(
+                message.chat.id,
+                f"👥 Ваша группа: {current_group or 'не выбрана'}\n\n"
+                f"Чтобы получать только свои колонки расписания, отправьте:\n"
+                f"/group НАЗВАНИЕ_ГРУППЫ\n"
+                f"Сбросить группу: /group -\n\n"
+                f"📋 Группы в расписании: {groups_text}"
+            )
+            return
+        
+        value = parts[1].strip()
+        if value in ('-', '—') or value.lower() in ('сброс', 'нет'):
+            db_manager.set_user_group(message.chat.id, None)
+            bot.send_message(message.chat.id, "✅ Группа сброшена, расписание будет приходить целиком")
+            return
+        
+        study_group = next((group for group in known_groups
+                            if normalize_group_name(group) == normalize_group_name(value)), None)
+        if study_group is None:
+            bot.send_message(message.chat.id, f"❌ Группа {value} не найдена в расписании. Список групп: /group")
+            return
+        
+        db_manager.set_user_group(message.chat.id, study_group)
+        bot.send_message(message.chat.id, f"✅ Группа {study_group} сохранена. Теперь в расписании будут только ее колонки")
+        
+    except Exception as e:
+        logger.error(f"Ошибка в set_study_group: {e}")
+        bot.send_message(message.chat.id, "❌ Ошибка при выборе группы!")
+
+@lru_cache(maxsize=SCHEDULE_TEXT_CACHE_SIZE)
+def build_schedule_text(group_name, building, date_iso, period, schedule_version):
+    """Текст расписания группы, кэшируется по группе, дате и версии расписания"""
+    entries = db_manager.get_schedule_entries(group_name=group_name, building=building)
+    date = datetime.strptime(date_iso, '%Y-%m-%d')
+    if period == 'week':
+        return format_week(entries, date, group_name)
+    return format_day(entries, date, group_name)
+
+def pack_parts(parts, separator, limit):
+    """Объединение частей текста в куски не длиннее limit, где это возможно"""
+    chunks = []
+    current = ''
+    for part in parts:
+        candidate = f"{current}{separator}{part}" if current else part
+        if len(candidate) > limit and current:
+            chunks.append(current)
+            candidate = part
+        current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+def split_message(text, limit=TELEGRAM_MESSAGE_LIMIT):
+    """Разбиение длинного текста по абзацам, а длинных абзацев по строкам на части для send_message"""
+    chunks = []
+    for chunk in pack_parts(text.split('\n\n'), '\n\n', limit):
+        if len(chunk) <= limit:
+            chunks.append(chunk)
+            continue
+        chunks.extend(part[:limit] for part in pack_parts(chunk.split('\n'), '\n', limit))
+    return chunks
+
+@bot.message_handler(commands=['today', 'tomorrow', 'week'])
+def send_schedule_text(message):
+    """Расписание группы текстом: /today, /tomorrow, /week [группа]"""
+    try:
+        parts = message.text.split(maxsplit=1)
+        command = parts[0].lstrip('/').split('@')[0].lower()
+        building = db_manager.get_user_building(message.chat.id)
+        
+        if len(parts) > 1:
+            requested = normalize_group_name(parts[1])
+            group_name = next((group for group in db_manager.get_schedule_groups()
+                               if normalize_group_name(group) == requested), None)
+            if group_name is None:
+                bot.send_message(message.chat.id, f"❌ Группа {parts[1].strip()} не найдена в расписании. Список групп: /group")
+                return
+        else:
+            group_name = db_manager.get_user_group(message.chat.id)
+            if not group_name:
+                bot.send_message(message.chat.id, "👥 Сначала выберите группу: /group НАЗВАНИЕ_ГРУППЫ")
+                return
+        
+        if building is None or group_name not in db_manager.get_schedule_groups(building):
+            building = None
+        
+        date = datetime.now()
+        if command == 'tomorrow':
+            date += timedelta(days=1)
+        period = 'week' if command == 'week' else 'day'
+        
+        text = build_schedule_text(group_name, building, date.strftime('%Y-%m-%d'), period,
+                                   db_manager.get_schedule_version(building))
+        for chunk in split_message(text):
+            bot.send_message(message.chat.id, chunk)
+        
+    except Exception as e:
+        logger.error(f"Ошибка в send_schedule_text: {e}")
+        bot.send_message(message.chat.id, "❌ Ошибка при получении расписания!")
+
+@bot.message_handler(commands=['find'])
+def find_in_schedule(message):
+    """Поиск преподавателя, аудитории или предмета: /find Иванов"""
+    try:
+        parts = message.text.split(maxsplit=1)
+        if len(parts) < 2 or not parts[1].strip():
+            bot.send_message(message.chat.id, "🔎 Укажите, что искать: /find Иванов, /find 205, /find Физика")
+            return
+        
+        query = parts[1].strip()
+        results = db_manager.search_schedule_cells(query, FIND_RESULTS_LIMIT + 1)
+        if not results:
+            bot.send_message(message.chat.id, f"🔎 По запросу «{query}» ничего не найдено")
+            return
+        
+        lines = [f"🔎 Результаты по запросу «{query}»:"]
+        for result in results[:FIND_RESULTS_LIMIT]:
+            place = ' · '.join(value for value in (f"Корпус {result['building']}", result['filename'],
+                                                   result['header'], result['row_label']) if value)
+            lines.append(f"\n📍 {place}\n{result['text']}")
+        if len(results) > FIND_RESULTS_LIMIT:
+            lines.append(f"\nПоказаны первые {FIND_RESULTS_LIMIT} совпадений, уточните запрос")
+        
+        for chunk in split_message('\n'.join(lines)):
+            bot.send_message(message.chat.id, chunk)
+        
+    except Exception as e:
+        logger.error(f"Ошибка в find_in_schedule: {e}")
+        bot.send_message(message.chat.id, "❌ Ошибка при поиске!")
+
+@bot.callback_query_handler(func=lambda call: call.data.startswith('group_building_'))
+def handle_group_building_selection(call):
+    """Обработчик выбора корпуса для группы"""
+    try:
+        building = int(call.data.split('_')[2])
+        building_name = "Корпус №1 (ФМПК)" if building == 1 else "Корпус №2 (ПТФ)"
+        
+        if db_manager.set_user_building(call.message.chat.id, building):
+            bot.edit_message_text(
+                chat_id=call.message.chat.id,
+                message_id=call.message.message_id,
+                text=f"✅ Корпус группы успешно изменен на:\n{building_name}\n\n"
+                     f"Теперь вы будете получать уведомления только о расписании для этого корпуса."
+            )
+        else:
+            bot.answer_callback_query(call.id, "❌ Ошибка при изменении корпуса!")
+            
+    except Exception as e:
+        logger.error(f"Ошибка при выборе корпуса группы: {e}")
+        bot.answer_callback_query(call.id, "❌ Ошибка при изменении корпуса!")
+
+@bot.message_handler(commands=['admin'])
+def request_admin(message):
+    """Запрос прав администратора"""
+    try:
+        user_id = message.from_user.id
+        username = message.from_user.username
+        first_name = message.from_user.first_name
+        last_name = message.from_user.last_name
+        
+        if admin_manager.is_admin(user_id):
+            bot.send_message(message.chat.id, "✅ Вы уже являетесь администратором!")
+            return
+        
+        if admin_manager.is_pending_admin(user_id):
+            bot.send_message(message.chat.id, "⏳ Ваш запрос уже отправлен и ожидает рассмотрения!")
+            return
+        
+        if admin_manager.add_admin_request(user_id, username, first_name, last_name):
+            user_info = f"ID: {user_id}\nUsername: @{username}\nИмя: {first_name} {last_name}"
+            
+            keyboard = InlineKeyboardMarkup()
+            keyboard.add(
+                InlineKeyboardButton("✅ Одобрить", callback_data=f'approve_admin_{user_id}'),
+                InlineKeyboardButton("❌ Отклонить", callback_data=f'reject_admin_{user_id}')
+            )
+            
+            bot.send_message(
+                MAIN_ADMIN_ID,
+                f"🆕 Новый запрос на админство:\n\n{user_info}",
+                reply_markup=keyboard
+            )
+            
+            bot.send_message(
+                message.chat.id,
+                "✅ Ваш запрос на права администратора отправлен на рассмотрение!"
+            )
+        else:
+            bot.send_message(message.chat.id, "❌ Ошибка при отправке запроса!")
+            
+    except Exception as e:
+        logger.error(f"Ошибка в request_admin: {e}")
+        bot.send_message(message.chat.id, "❌ Ошибка при отправке запроса!")
+
+@bot.message_handler(commands=['admin_panel'])
+def admin_panel(message):
+    """Панель администратора"""
+    try:
+        user_id = message.from_user.id
+        
+        if not admin_manager.is_admin(user_id):
+            bot.send_message(message.chat.id, "❌ У вас нет прав администратора!")
+            return
+        
+        admin_states[user_id] = 'admin_mode'
+        keyboard = create_admin_keyboard()
+        
+        bot.send_message(
+            message.chat.id,
+            "👨‍💻 Добро пожаловать в панель администратора!\n\n"
+            "Выберите действие:",
+            reply_markup=keyboard
+        )
+            
+    except Exception as e:
+        logger.error(f"Ошибка в admin_panel: {e}")
+        bot.send_message(message.chat.id, "❌ Ошибка при открытии панели админа!")
+
+@bot.message_handler(func=lambda message: admin_states.get(message.from_user.id) == 'admin_mode')
+def handle_admin_actions(message):
+    """Обработчик действий админа"""
+    try:
+        user_id = message.from_user.id
+        
+        if message.text == "📊 Статистика":
+            send_detailed_stats(message)
+            
+        elif message.text == "📢 Отправить всем":
+            request_broadcast_message(message)
+            
+        elif message.text == "🔄 Обновить расписание":
+            force_update_schedule(message)
+            
+        elif message.text == "❌ Выйти из админ-панели":
+            exit_admin_panel(message)
+            
+    except Exception as e:
+        logger.error(f"Ошибка в handle_admin_actions: {e}")
+        bot.send_message(message.chat.id, "❌ Ошибка при выполнении действия!")
+
+def send_detailed_stats(message):
+    """Отправка подробной статистики"""
+    try:
+        users = db_manager.get_all_users()
+        admins = admin_manager.get_all_admins()
+        pending_requests = admin_manager.get_pending_requests()
+        pending_actions = admin_manager.get_pending_actions()
+        encoding_summary = db_manager.get_encoding_summary()
+        encoded_size = sum(row[2] or 0 for row in encoding_summary)
+        jpeg_size = sum(row[3] or 0 for row in encoding_summary)
+        
+        stats_text = (
+            f"📊 ДЕТАЛЬНАЯ СТАТИСТИКА:\n\n"
+            f"👥 ПОЛЬЗОВАТЕЛИ:\n"
+            f"• Всего: {len(users)}\n"
+            f"• Группы: {sum(1 for u in users.values() if u['is_group'])}\n"
+            f"• Личные чаты: {sum(1 for u in users.values() if not u['is_group'])}\n"
+            f"• Корпус 1: {sum(1 for u in users.values() if u['building'] == 1)}\n"
+            f"• Корпус 2: {sum(1 for u in users.values() if u['building'] == 2)}\n\n"
+            f"👨‍💻 АДМИНИСТРАТОРЫ:\n"
+            f"• Всего: {len(admins)}\n"
+            f"• Ожидают одобрения: {len(pending_requests)}\n"
+            f"• Ожидают действий: {len(pending_actions)}\n\n"
+            f"📁 ФАЙЛЫ:\n"
+            f"• Корпус 1: {len(get_schedule_files(1))} файлов\n"
+            f"• Корпус 2: {len(get_schedule_files(2))} файлов\n"
+            f"• Отслеживаемых: {len(db_manager.get_known_files(1)) + len(db_manager.get_known_files(2))}\n\n"
+            f"🖼 ИЗОБРАЖЕНИЯ:\n"
+            + ''.join(f"• {row[0]}: {row[1]} стр.\n" for row in encoding_summary)
+            + f"• Сэкономлено: {(jpeg_size - encoded_size) // 1024} КБ из {jpeg_size // 1024} КБ"
+        )
+        
+        bot.send_message(message.chat.id, stats_text)
+        
+    except Exception as e:
+        logger.error(f"Ошибка в send_detailed_stats: {e}")
+        bot.send_message(message.chat.id, "❌ Ошибка при получении статистики!")
+
+def request_broadcast_message(message):
+    """Запрос сообщения для рассылки"""
+    try:
+        admin_states[message.from_user.id] = 'awaiting_broadcast'
+        bot.send_message(
+            message.chat.id,
+            "📝 Введите сообщение для рассылки всем пользователям:",
+            reply_markup=ReplyKeyboardMarkup(resize_keyboard=True).add(KeyboardButton("❌ Отмена"))
+        )
+        
+    except Exception as e:
+        logger.error(f"Ошибка в request_broadcast_message: {e}")
+        bot.send_message(message.chat.id, "❌ Ошибка при запросе сообщения!")
+
+@bot.message_handler(func=lambda message: admin_states.get(message.from_user.id) == 'awaiting_broadcast')
+def handle_broadcast_message(message):
+    """Обработка сообщения для рассылки"""
+    try:
+        if message.text == "❌ Отмена":
+            exit_admin_panel(message)
+            return
+
+        action_id = admin_manager.add_admin_action(
+            message.from_user.id,
+            'broadcast',
+            message.text
+        )
+        
+        if action_id:
+            admin_info = f"Админ: @{message.from_user.username or message.from_user.first_name}"
+            
+            keyboard = InlineKeyboardMarkup()
+            keyboard.add(
+                InlineKeyboardButton("✅ Одобрить рассылку", callback_data=f'approve_broadcast_{action_id}'),
+                InlineKeyboardButton("❌ Отклонить", callback_data=f'reject_broadcast_{action_id}')
+            )
+            
+            bot.send_message(
+                MAIN_ADMIN_ID,
+                f"📢 ЗАПРОС НА РАССЫЛКУ:\n\n"
+                f"{admin_info}\n\n"
+                f"Сообщение:\n{message.text}",
+                reply_markup=keyboard
+            )
+            
+            bot.send_message(
+                message.chat.id,
+                "✅ Запрос на рассылку отправлен на подтверждение главному администратору!"
+            )
+            
+            admin_states[message.from_user.id] = 'admin_mode'
+            
+        else:
+            bot.send_message(message.chat.id, "❌ Ошибка при создании запроса на рассылку!")
+            
+    except Exception as e:
+        logger.error(f"Ошибка в handle_broadcast_message: {e}")
+        bot.send_message(message.chat.id, "❌ Ошибка при обработке сообщения!")
+
+def force_update_schedule(message):
+    """Принудительное обновление расписания"""
+    try:
+        bot.send_message(message.chat.id, "🔄 Принудительное обновление расписания...")
+        
+        status, _ = update_schedule(force=True)
+        if status:
+            new_files = check_new_files()
+            
+            if new_files:
+                bot.send_message(message.chat.id, f"✅ Расписание обновлено! Найдено {len(new_files)} новых/измененных файлов.")
+            else:
+                bot.send_message(message.chat.id, "✅ Расписание обновлено! Новых файлов не обнаружено.")
+        else:
+            bot.send_message(message.chat.id, "❌ Не удалось обновить расписание!")
+            
+    except Exception as e:
+        logger.error(f"Ошибка в force_update_schedule: {e}")
+        bot.send_message(message.chat.id, "❌ Ошибка при обновлении расписания!")
+
+def exit_admin_panel(message):
+    """Выход из панели админа"""
+    try:
+        user_id = message.from_user.id
+        if user_id in admin_states:
+            del admin_states[user_id]
+        
+        building = db_manager.get_user_building(user_id)
+        if building:
+            keyboard = create_files_keyboard(building)
+            bot.send_message(
+                message.chat.id,
+                "✅ Вы вышли из панели администратора.",
+                reply_markup=keyboard
+            )
+        else:
+            bot.send_message(
+                message.chat.id,
+                "✅ Вы вышли из панели администратора.",
+                reply_markup=ReplyKeyboardRemove()
+            )
+            
+    except Exception as e:
+        logger.error(f"Ошибка в exit_admin_panel: {e}")
+
+@bot.callback_query_handler(func=lambda call: call.data.startswith(('approve_admin_', 'reject_admin_')))
+def handle_admin_approval(call):
+    """Обработчик одобрения/отклонения админов"""
+    try:
+        action = call.data.split('_')[0]
+        user_id = int(call.data.split('_')[2])
+        
+        if action == 'approve':
+            first_name = admin_manager.approve_admin(user_id, call.from_user.id)
+            if first_name:
+                try:
+                    bot.send_message(
+                        user_id,
+                        f"✅ Ваш запрос на права администратора одобрен!\n\n"
+                        f"Используйте команду /admin_panel для доступа к панели управления."
+                    )
+                except:
+                    pass
+                
+                bot.answer_callback_query(call.id, f"✅ {first_name} теперь администратор!")
+                bot.edit_message_text(
+                    chat_id=call.message.chat.id,
+                    message_id=call.message.message_id,
+                    text=f"✅ Администратор одобрен: {first_name}"
+                )
+            else:
+                bot.answer_callback_query(call.id, "❌ Ошибка одобрения!")
+                
+        else:
+            if admin_manager.reject_admin(user_id):
+                try:
+                    bot.send_message(
+                        user_id,
+                        "❌ Ваш запрос на права администратора отклонен."
+                    )
+                except:
+                    pass
+                
+                bot.answer_callback_query(call.id, "✅ Запрос отклонен!")
+                bot.edit_message_text(
+                    chat_id=call.message.chat.id,
+                    message_id=call.message.message_id,
+                    text="❌ Запрос на админство отклонен"
+                )
+            else:
+                bot.answer_callback_query(call.id, "❌ Ошибка отклонения!")
+                
+    except Exception as e:
+        logger.error(f"Ошибка в handle_admin_approval: {e}")
+        bot.answer_callback_query(call.id, "❌ Ошибка обработки запроса!")
+
+@bot.callback_query_handler(func=lambda call: call.data.startswith(('approve_broadcast_', 'reject_broadcast_')))
+def handle_broadcast_approval(call):
+    """Обработчик одобрения/отклонения рассылки"""
+    try:
+        action = call.data.split('_')[0]
+        action_id = int(call.data.split('_')[2])
+        
+        if action == 'approve':
+            result = admin_manager.approve_action(action_id, call.from_user.id)
+            if result:
+                action_type, action_data, admin_id = result
+                
+                users = db_manager.get_all_users()
+                success_count = 0
+                fail_count = 0
+                
+                for user_id in users.keys():
+                    try:
+                        bot.send_message(user_id, f"📢 ОБЪЯВЛЕНИЕ:\n\n{action_data}")
+                        success_count += 1
+                        time.sleep(0.1)
+                    except:
+                        fail_count += 1
+                
+                bot.send_message(
+                    admin_id,
+                    f"✅ Рассылка выполнена!\n"
+                    f"• Успешно: {success_count}\n"
+                    f"• Не удалось: {fail_count}"
+                )
+                
+                bot.answer_callback_query(call.id, "✅ Рассылка одобрена и выполнена!")
+                bot.edit_message_text(
+                    chat_id=call.message.chat.id,
+                    message_id=call.message.message_id,
+                    text=f"✅ Рассылка выполнена!\nОтправлено: {success_count} пользователям"
+                )
+            else:
+                bot.answer_callback_query(call.id, "❌ Ошибка одобрения рассылки!")
+                
+        else:
+            if admin_manager.reject_action(action_id):
+                admin_id = call.data.split('_')[2]
+                try:
+                    bot.send_message(
+                        admin_id,
+                        "❌ Ваш запрос на рассылку отклонен главным администратором."
+                    )
+                except:
+                    pass
+                
+                bot.answer_callback_query(call.id, "✅ Рассылка отклонена!")
+                bot.edit_message_text(
+                    chat_id=call.message.chat.id,
+                    message_id=call.message.message_id,
+                    text="❌ Рассылка отклонена"
+                )
+            else:
+                bot.answer_callback_query(call.id, "❌ Ошибка отклонения рассылки!")
+                
+    except Exception as e:
+        logger.error(f"Ошибка в handle_broadcast_approval: {e}")
+        bot.answer_callback_query(call.id, "❌ Ошибка обработки рассылки!")
+
+def main():
+    """Основная функция"""
+    logger.info("Запуск бота расписания...")
+    
+    try:
+        schedule_generations.migrate(schedule_store.load_manifest()['version'])
+        schedule_generations.reclaim()
+        upgrade_schedule_hashes()
+    except Exception as e:
+        logger.error(f"Ошибка подготовки поколений расписания: {e}")
+    
+    get_render_pool()
+    
+    status, _ = update_schedule()
+    if status:
+        for building in [1, 2]:
+            schedule_folder = find_schedule_folder(EXTRACT_FOLDER, building)
+            if schedule_folder:
+                files = get_schedule_files(building)
+                file_hashes = schedule_file_hashes(schedule_folder)
+                missing_paths = [os.path.join(schedule_folder, filename) for filename in files
+                                 if filename not in file_hashes]
+                fingerprint_hashes = db_manager.get_file_hashes(missing_paths) if missing_paths else {}
+                for filename in files:
+                    file_path = os.path.join(schedule_folder, filename)
+                    file_hash = file_hashes.get(filename) or fingerprint_hashes.get(file_path)
+                    if file_hash:
+                        db_manager.save_file_info(filename, file_hash, building)
+                logger.info(f"Сохранено {len(files)} файлов для корпуса {building} при первом запуске")
+    
+    update_thread = threading.Thread(target=periodic_update, daemon=True)
+    update_thread.start()
+    
+    logger.info("Бот запущен. Ожидание сообщений...")
+    bot.infinity_polling()
@@ -0,0 +1,127 @@
+from difflib import SequenceMatcher
+from schedule_parser import find_header, find_columns, iter_table_cells
+
+class TableDiff:
+    """Изменения между двумя версиями таблиц одного файла
+
+    changed_cells - кортежи (таблица, строка, колонка, было, стало) с
+    номерами строк новой версии, added_rows и removed_rows - пары
+    (таблица, строка) в новой и старой версии соответственно.
+    """
+
+    def __init__(self):
+        self.changed_cells = []
+        self.added_rows = []
+        self.removed_rows = []
+        self.shape_changed = False
+
+    @property
+    def changed_rows(self):
+        """Строки новой версии с измененными ячейками или добавленные"""
+        rows = {(table, row) for table, row, _, _, _ in self.changed_cells}
+        rows.update(self.added_rows)
+        return sorted(rows)
+
+    @property
+    def row_count(self):
+        return len(self.changed_rows) + len(self.removed_rows)
+
+    def __bool__(self):
+        return self.shape_changed or bool(self.changed_cells or self.added_rows or self.removed_rows)
+
+def diff_rows(diff, table_index, old_row, new_row, new_index):
+    for col in range(max(len(old_row), len(new_row))):
+        old_value = old_row[col] if col < len(old_row) else ''
+        new_value = new_row[col] if col < len(new_row) else ''
+        if old_value != new_value:
+            diff.changed_cells.append((table_index, new_index, col, old_value, new_value))
+
+def diff_tables(old_tables, new_tables):
+    """Сравнение таблиц по строкам, замененные строки сравниваются по ячейкам"""
+    diff = TableDiff()
+    if len(old_tables) != len(new_tables):
+        diff.shape_changed = True
+        return diff
+
+    for table_index, (old_table, new_table) in enumerate(zip(old_tables, new_tables)):
+        if old_table and new_table and len(old_table[0]) != len(new_table[0]):
+            diff.shape_changed = True
+            return diff
+
+        matcher = SequenceMatcher(None, [tuple(row) for row in old_table],
+                                  [tuple(row) for row in new_table], autojunk=False)
+        for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+            if tag == 'equal':
+                continue
+            paired = min(old_end - old_start, new_end - new_start) if tag == 'replace' else 0
+            for offset in range(paired):
+                diff_rows(diff, table_index, old_table[old_start + offset], new_table[new_start + offset],
+                          new_start + offset)
+            diff.removed_rows.extend((table_index, row) for row in range(old_start + paired, old_end))
+            diff.added_rows.extend((table_index, row) for row in range(new_start + paired, new_end))
+    return diff
+
+def cell_descriptions(tables):
+    """Заголовки колонок и подписи строк ячеек по (таблица, строка, колонка)"""
+    descriptions = {}
+    labels = {}
+    for table_index, table in enumerate(tables):
+        for row_index, col_index, _, header, row_label in iter_table_cells(table):
+            descriptions[(table_index, row_index, col_index)] = header
+            labels[(table_index, row_index)] = row_label
+    return descriptions, labels
+
+def shorten(text, limit):
+    return text if len(text) <= limit else text[:limit - 1] + '…'
+
+def describe_diff(diff, old_tables, new_tables, limit=30, line_limit=300):
+    """Строки сообщения об изменениях, не больше limit строк по line_limit символов"""
+    headers, labels = cell_descriptions(new_tables)
+    _, old_labels = cell_descriptions(old_tables)
+    lines = []
+
+    for table_index, row_index, col_index, old_value, new_value in diff.changed_cells:
+        place = ' · '.join(value for value in (labels.get((table_index, row_index)),
+                                               headers.get((table_index, row_index, col_index))) if value)
+        change = f"{old_value or '—'} → {new_value or '—'}"
+        lines.append(f"✏️ {place}: {change}" if place else f"✏️ {change}")
+    for table_index, row_index in diff.added_rows:
+        row = ' | '.join(cell for cell in new_tables[table_index][row_index] if cell)
+        lines.append(f"➕ {row}")
+    for table_index, row_index in diff.removed_rows:
+        label = old_labels.get((table_index, row_index))
+        row = ' | '.join(cell for cell in old_tables[table_index][row_index] if cell)
+        lines.append(f"➖ {label}: {row}" if label else f"➖ {row}")
+
+    lines = [shorten(line, line_limit) for line in lines]
+    if len(lines) > limit:
+        hidden = len(lines) - limit
+        lines = lines[:limit] + [f"… и еще {hidden} изменений"]
+    return lines
+
+def changed_rows_tables(diff, new_tables):
+    """Таблицы из строки заголовка и измененных строк для рендера"""
+    rows_by_table = {}
+    for table_index, row_index in diff.changed_rows:
+        rows_by_table.setdefault(table_index, []).append(row_index)
+
+    tables = []
+    for table_index, row_indexes in sorted(rows_by_table.items()):
+        table = new_tables[table_index]
+        header_index = find_header(table)
+        rows = []
+        day_col = None
+        if header_index is not None:
+            day_col = find_columns(table[header_index], table[header_index + 1:])[0]
+            if header_index not in row_indexes:
+                rows.append(table[header_index])
+
+        for row_index in row_indexes:
+            row = list(table[row_index])
+            if day_col is not None and day_col < len(row) and not row[day_col].strip():
+                # День из объединенной ячейки выше, чтобы строка читалась отдельно
+                row[day_col] = next((above[day_col] for above in reversed(table[:row_index])
+                                     if day_col < len(above) and above[day_col].strip()), '')
+            rows.append(row)
+        tables.append(rows)
+    return tables
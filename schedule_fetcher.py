@@ -0,0 +1,165 @@
+import io
+import os
+import json
+import time
+import tempfile
+import logging
+import requests
+
+logger = logging.getLogger(__name__)
+
+FETCH_STATE_FILE = 'fetch_state.json'
+
+FETCH_UPDATED = 'updated'
+FETCH_NOT_MODIFIED = 'not_modified'
+FETCH_FAILED = 'failed'
+
+class SpoolBuffer:
+    """Буфер в памяти, который переносится во временный файл после max_size байт
+
+    В отличие от tempfile.SpooledTemporaryFile до Python 3.11, буфер
+    поддерживает весь интерфейс файла (в том числе seekable), поэтому
+    zipfile открывает архив прямо из него.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._file = io.BytesIO()
+        self.rolled = False
+
+    def write(self, data):
+        if not self.rolled and self._file.tell() + len(data) > self.max_size:
+            self.rollover()
+        return self._file.write(data)
+
+    def rollover(self):
+        """Перенос содержимого во временный файл на диске"""
+        if self.rolled:
+            return
+        position = self._file.tell()
+        spooled = tempfile.TemporaryFile()
+        spooled.write(self._file.getbuffer())
+        spooled.seek(position)
+        self._file = spooled
+        self.rolled = True
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._file.close()
+
+class ConditionalFetcher:
+    """Скачивание файла только при его изменении на сервере
+
+    Валидаторы последнего ответа (ETag, Last-Modified, размер) хранятся в
+    JSON файле. Запрос отправляется с If-None-Match и If-Modified-Since,
+    ответ 304 или совпавший валидатор означает, что файл не изменился.
+    Если сервер не отдает валидаторов, размер сравнивается HEAD запросом,
+    но не дольше head_max_age секунд с последнего полного скачивания:
+    правка с тем же размером архива иначе осталась бы незамеченной.
+
+    Новые валидаторы сохраняются только после commit, когда скачанный
+    файл успешно обработан.
+    """
+
+    def __init__(self, state_file=FETCH_STATE_FILE, head_max_age=600, timeout=30, session=None):
+        self.state_file = state_file
+        self.head_max_age = head_max_age
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.state = self.load_state()
+        self.pending = {}
+
+    def load_state(self):
+        if not self.state_file or not os.path.exists(self.state_file):
+            return {}
+        try:
+            with open(self.state_file, encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Ошибка чтения состояния загрузки {self.state_file}: {e}")
+            return {}
+
+    def save_state(self):
+        if not self.state_file:
+            return
+        tmp_path = self.state_file + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.state_file)
+
+    @staticmethod
+    def validators(response):
+        return {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_length': response.headers.get('Content-Length'),
+        }
+
+    def unchanged_by_head(self, url, known):
+        """Проверка размера HEAD запросом для серверов без валидаторов"""
+        if known.get('etag') or known.get('last_modified') or not known.get('content_length'):
+            return False
+        if time.time() - known.get('fetched_at', 0) > self.head_max_age:
+            return False
+        try:
+            response = self.session.head(url, allow_redirects=True, timeout=self.timeout)
+            return response.ok and response.headers.get('Content-Length') == known['content_length']
+        except Exception as e:
+            logger.warning(f"HEAD запрос {url} не удался: {e}")
+            return False
+
+    def fetch(self, url, output, force=False):
+        """Запись файла в output, если он изменился, возвращает FETCH_*"""
+        known = {} if force else self.state.get(url, {})
+        if self.unchanged_by_head(url, known):
+            return FETCH_NOT_MODIFIED
+
+        headers = {}
+        if known.get('etag'):
+            headers['If-None-Match'] = known['etag']
+        if known.get('last_modified'):
+            headers['If-Modified-Since'] = known['last_modified']
+
+        try:
+            with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+                if response.status_code == 304:
+                    return FETCH_NOT_MODIFIED
+                response.raise_for_status()
+
+                current = self.validators(response)
+                if (known.get('etag') and current['etag'] == known['etag']) or \
+                        (not current['etag'] and known.get('last_modified') and
+                         current['last_modified'] == known['last_modified']):
+                    return FETCH_NOT_MODIFIED
+
+                size = 0
+                for chunk in response.iter_content(chunk_size=65536):
+                    if chunk:
+                        output.write(chunk)
+                        size += len(chunk)
+
+            current['content_length'] = current['content_length'] or str(size)
+            current['fetched_at'] = time.time()
+            self.pending[url] = current
+            return FETCH_UPDATED
+        except Exception as e:
+            logger.error(f"Ошибка при скачивании: {e}")
+            return FETCH_FAILED
+
+    def commit(self, url):
+        """Сохранение валидаторов успешно обработанной загрузки"""
+        if url in self.pending:
+            self.state[url] = self.pending.pop(url)
+            try:
+                self.save_state()
+            except Exception as e:
+                logger.error(f"Ошибка сохранения состояния загрузки: {e}")
+
+    def discard(self, url):
+        """Отказ от валидаторов загрузки, которую не удалось обработать"""
+        self.pending.pop(url, None)
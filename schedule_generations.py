@@ -0,0 +1,128 @@
+import os
+import shutil
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+GENERATIONS_FOLDER = 'schedule_generations'
+GENERATION_PREFIX = 'gen-'
+
+class GenerationManager:
+    """Поколения папки расписания с атомарным переключением
+
+    Каждое обновление собирается в новой папке gen-N, а папка расписания
+    становится символьной ссылкой на текущее поколение. Ссылка заменяется
+    через os.replace, поэтому читатели видят либо старое, либо новое
+    поколение целиком. Долгие операции закрепляют поколение через pin и
+    работают с ним до конца, старые поколения удаляются, когда их никто
+    не использует.
+    """
+
+    def __init__(self, link_path, root=GENERATIONS_FOLDER):
+        self.link_path = link_path
+        self.root = root
+        self._lock = threading.Lock()
+        self._pins = {}
+        self._building = set()
+        os.makedirs(root, exist_ok=True)
+
+    def generation_path(self, number):
+        return os.path.join(self.root, f"{GENERATION_PREFIX}{number}")
+
+    @staticmethod
+    def generation_number(path):
+        """Номер поколения по пути его папки или None"""
+        name = os.path.basename(os.path.normpath(path or ''))
+        if name.startswith(GENERATION_PREFIX) and name[len(GENERATION_PREFIX):].isdigit():
+            return int(name[len(GENERATION_PREFIX):])
+        return None
+
+    def current(self):
+        """Папка текущего поколения или None, если оно еще не опубликовано"""
+        if not os.path.islink(self.link_path):
+            return None
+        path = os.path.join(os.path.dirname(self.link_path), os.readlink(self.link_path))
+        return os.path.normpath(path) if os.path.isdir(path) else None
+
+    def migrate(self, number=0):
+        """Перенос обычной папки расписания в поколение number и замена ее ссылкой"""
+        if os.path.islink(self.link_path) or not os.path.isdir(self.link_path):
+            return False
+        target = self.generation_path(number)
+        if os.path.exists(target):
+            shutil.rmtree(target)
+        os.replace(self.link_path, target)
+        self._link(target)
+        logger.info(f"Папка {self.link_path} перенесена в поколение {target}")
+        return True
+
+    def begin(self, number):
+        """Пустая папка для сборки поколения number"""
+        path = self.generation_path(number)
+        with self._lock:
+            if os.path.normpath(path) == self.current():
+                raise ValueError(f"Поколение {number} уже опубликовано")
+            self._building.add(path)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.makedirs(path)
+        return path
+
+    def publish(self, path):
+        """Атомарное переключение папки расписания на собранное поколение"""
+        with self._lock:
+            self._link(path)
+            self._building.discard(path)
+        self.reclaim()
+
+    def abandon(self, path):
+        """Удаление поколения, сборка которого не удалась"""
+        with self._lock:
+            self._building.discard(path)
+        shutil.rmtree(path, ignore_errors=True)
+
+    def _link(self, path):
+        tmp_link = self.link_path + '.tmp'
+        if os.path.lexists(tmp_link):
+            os.remove(tmp_link)
+        os.symlink(os.path.relpath(path, os.path.dirname(self.link_path) or '.'), tmp_link)
+        os.replace(tmp_link, self.link_path)
+
+    @contextmanager
+    def pin(self):
+        """Закрепление текущего поколения на время операции, выдает путь к нему
+
+        Пока поколение закреплено, оно не удаляется, даже если опубликовано
+        новое. Если поколений еще нет, выдается сама папка расписания.
+        """
+        with self._lock:
+            path = self.current()
+            if path:
+                self._pins[path] = self._pins.get(path, 0) + 1
+        try:
+            yield path or self.link_path
+        finally:
+            if path:
+                with self._lock:
+                    self._pins[path] -= 1
+                    if not self._pins[path]:
+                        del self._pins[path]
+                self.reclaim()
+
+    def reclaim(self):
+        """Удаление поколений, кроме текущего, собираемых и закрепленных"""
+        with self._lock:
+            current = self.current()
+            busy = set(self._pins) | set(self._building) | {current}
+            stale = []
+            for name in os.listdir(self.root):
+                path = os.path.join(self.root, name)
+                if self.generation_number(path) is not None and path not in busy:
+                    stale.append(path)
+        for path in stale:
+            shutil.rmtree(path, ignore_errors=True)
+        if stale:
+            logger.info(f"Удалено старых поколений расписания: {len(stale)}")
+        return len(stale)
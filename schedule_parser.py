@@ -0,0 +1,260 @@
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Увеличивать при изменении разбора, чтобы уже разобранные файлы разобрались заново
+PARSER_VERSION = '2'
+
+# Основы названий дней недели, индекс совпадает с datetime.weekday()
+DAY_STEMS = ('понедельн', 'вторн', 'сред', 'четверг', 'пятниц', 'суббот', 'воскресен')
+DAY_NAMES = ('Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница', 'Суббота', 'Воскресенье')
+DAY_ABBREVIATIONS = ('пн', 'вт', 'ср', 'чт', 'пт', 'сб', 'вс')
+
+DAY_PATTERN = re.compile(r'\b(' + '|'.join(DAY_STEMS) + r')[а-яё]*', re.IGNORECASE)
+DATE_PATTERN = re.compile(r'(?<![\d:.])(\d{1,2})\.(\d{1,2})(?:\.(?:\d{4}|\d{2}))?(?![\d:])')
+TIME_RANGE_PATTERN = re.compile(r'\b\d{1,2}[:.]\d{2}\s*[-–—]?\s*(?:\d{1,2}[:.]\d{2})?')
+PAIR_PATTERN = re.compile(r'^\s*(\d{1,2})\s*(?:пара|п\.?|-?я)?\s*$', re.IGNORECASE)
+GROUP_PATTERN = re.compile(
+    r'^(?:[А-ЯЁA-Z]{1,6}[-\s]?\d{1,3}|\d{1,2}[-\s]?[А-ЯЁA-Z]{1,6}(?:[-\s]?\d{1,3})?)'
+    r'(?:[-/.]?[А-ЯЁа-яёA-Za-z0-9]{1,4})?$'
+)
+TEACHER_PATTERN = re.compile(
+    r'[А-ЯЁ][а-яё]+(?:-[А-ЯЁ][а-яё]+)?\s+[А-ЯЁ]\.\s*(?:[А-ЯЁ]\.?)?'
+    r'|[А-ЯЁ]\.\s*[А-ЯЁ]\.\s*[А-ЯЁ][а-яё]+'
+)
+ROOM_PATTERN = re.compile(
+    r'(?:\b(?:ауд(?:итория)?|каб(?:инет)?|лаб)\.?\s*[№]?\s*[\w\-/]+)'
+    r'|(?:\b(?:спортзал|спорт\.\s*зал|актовый зал|с/з)\b)'
+    r'|(?:\b\d{1,2}-\d{2,3}[а-яё]?\b)'
+    r'|(?:\b\d{3}[а-яё]?\b)',
+    re.IGNORECASE
+)
+
+DAY_HEADERS = ('день', 'дни', 'дата')
+PAIR_HEADERS = ('№', 'пара', 'урок')
+TIME_HEADERS = ('время', 'звонки')
+EMPTY_LESSONS = ('', '-', '–', '—', 'х', 'x')
+
+def detect_day(text):
+    """Индекс дня недели и дата в формате ДД.ММ из текста, если они есть"""
+    day_index = None
+    text = text or ''
+    match = DAY_PATTERN.search(text)
+    if match:
+        day_index = DAY_STEMS.index(match.group(1).lower())
+    elif text.strip().lower().rstrip('.') in DAY_ABBREVIATIONS:
+        day_index = DAY_ABBREVIATIONS.index(text.strip().lower().rstrip('.'))
+
+    lesson_date = None
+    for date_match in DATE_PATTERN.finditer(text):
+        day, month = int(date_match.group(1)), int(date_match.group(2))
+        if 1 <= day <= 31 and 1 <= month <= 12:
+            lesson_date = f"{day:02d}.{month:02d}"
+            break
+    return day_index, lesson_date
+
+def parse_lesson(text):
+    """Разбор текста ячейки на предмет, преподавателя и аудиторию"""
+    teachers = [match.group().strip() for match in TEACHER_PATTERN.finditer(text)]
+    remainder = TEACHER_PATTERN.sub(' ', text)
+    rooms = [match.group().strip() for match in ROOM_PATTERN.finditer(remainder)]
+    remainder = ROOM_PATTERN.sub(' ', remainder)
+    remainder = TIME_RANGE_PATTERN.sub(' ', remainder)
+    subject = re.sub(r'\s+', ' ', remainder).strip(' ,;:-–—/')
+    return subject, ', '.join(teachers), ', '.join(rooms)
+
+def is_group_name(text):
+    text = text.strip()
+    if not GROUP_PATTERN.match(text) or TIME_RANGE_PATTERN.search(text):
+        return False
+    return detect_day(text) == (None, None)
+
+def header_matches(text, keywords):
+    text = text.strip().lower()
+    return any(text.startswith(keyword) for keyword in keywords)
+
+def find_columns(header, rows):
+    """Колонки дня, номера пары, времени и групп по заголовку и содержимому"""
+    day_col = pair_col = time_col = None
+    group_cols = []
+    for col, cell in enumerate(header):
+        column = [row[col] for row in rows if col < len(row) and row[col].strip()]
+        if day_col is None and (header_matches(cell, DAY_HEADERS) or
+                                (column and sum(detect_day(value)[0] is not None for value in column) * 2 > len(column))):
+            day_col = col
+        elif pair_col is None and (header_matches(cell, PAIR_HEADERS) or
+                                   (column and all(PAIR_PATTERN.match(value) for value in column))):
+            pair_col = col
+        elif time_col is None and (header_matches(cell, TIME_HEADERS) or
+                                   (column and all(TIME_RANGE_PATTERN.match(value) for value in column))):
+            time_col = col
+        elif is_group_name(cell) and cell not in [header[c] for c in group_cols]:
+            group_cols.append(col)
+    return day_col, pair_col, time_col, group_cols
+
+def find_header(table):
+    """Номер строки заголовка с названиями групп"""
+    for index, row in enumerate(table[:6]):
+        if any(is_group_name(cell) for cell in row):
+            return index
+    return None
+
+def parse_table(table, table_index=0, default_day=(None, None)):
+    """Структурированные записи занятий из одной таблицы"""
+    header_index = find_header(table)
+    if header_index is None:
+        return []
+
+    entries = []
+    header = table[header_index]
+    data_rows = table[header_index + 1:]
+    day_col, pair_col, time_col, group_cols = find_columns(header, data_rows)
+    day_index, lesson_date = default_day
+    last_pair = None
+
+    for row_index, row in enumerate(data_rows, start=header_index + 1):
+        if row == header:
+            continue
+        if group_cols and sum(is_group_name(row[col]) for col in group_cols if col < len(row)) * 2 > len(group_cols):
+            # Повтор заголовка с другим набором групп внутри той же таблицы
+            header = row
+            day_col, pair_col, time_col, group_cols = find_columns(header, data_rows[row_index - header_index:])
+            continue
+
+        if day_col is not None and day_col < len(row) and row[day_col].strip():
+            row_day, row_date = detect_day(row[day_col])
+            if row_date is not None:
+                lesson_date = row_date
+            elif row_day is not None and row_day != day_index:
+                # Новый день без своей даты, дата прошлого дня к нему не относится
+                lesson_date = None
+            if row_day is not None:
+                day_index = row_day
+
+        pair_number = None
+        if pair_col is not None and pair_col < len(row):
+            pair_match = PAIR_PATTERN.match(row[pair_col])
+            if pair_match:
+                pair_number = int(pair_match.group(1))
+        if pair_number is None and pair_col is not None:
+            pair_number = last_pair
+        last_pair = pair_number
+
+        time_text = ''
+        if time_col is not None and time_col < len(row):
+            time_text = row[time_col].strip()
+
+        for col in group_cols:
+            if col >= len(row) or row[col].strip().lower() in EMPTY_LESSONS:
+                continue
+            text = row[col].strip()
+            subject, teacher, room = parse_lesson(text)
+            entries.append({
+                'group_name': header[col].strip(),
+                'day_index': day_index,
+                'day': DAY_NAMES[day_index] if day_index is not None else None,
+                'lesson_date': lesson_date,
+                'pair_number': pair_number,
+                'time': time_text,
+                'subject': subject,
+                'teacher': teacher,
+                'room': room,
+                'raw_text': text,
+                'table_index': table_index,
+                'row_index': row_index,
+                'col_index': col,
+            })
+    return entries
+
+def parse_schedule_tables(tables, context_text=''):
+    """Структурированные записи занятий из всех таблиц файла
+
+    context_text - имя файла и текст вне таблиц, из них берется день или
+    дата для расписаний на один день без колонки дня.
+    """
+    default_day = detect_day(context_text)
+    entries = []
+    for table_index, table in enumerate(tables):
+        try:
+            entries.extend(parse_table(table, table_index, default_day))
+        except Exception as e:
+            logger.error(f"Ошибка разбора таблицы {table_index}: {e}")
+    return entries
+
+def normalize_group_name(name):
+    """Название группы для сравнения без учета регистра и пробелов"""
+    return re.sub(r'\s+', '', name or '').casefold()
+
+def slice_table(table, group_name):
+    """Заголовок, колонки дня, пары и времени и колонки одной группы
+
+    Возвращает None, если группы в таблице нет. Блоки с повторным
+    заголовком и другим набором групп обрабатываются отдельно.
+    """
+    header_index = find_header(table)
+    if header_index is None:
+        return None
+
+    target = normalize_group_name(group_name)
+    blocks = []
+    start = header_index
+    group_cols = find_columns(table[start], table[start + 1:])[3]
+    for index in range(header_index + 1, len(table)):
+        row = table[index]
+        if row == table[start] or not group_cols:
+            continue
+        if sum(is_group_name(row[col]) for col in group_cols if col < len(row)) * 2 > len(group_cols):
+            blocks.append((start, index))
+            start = index
+            group_cols = find_columns(table[start], table[start + 1:])[3]
+    blocks.append((start, len(table)))
+
+    sliced = []
+    for block_start, block_end in blocks:
+        header = table[block_start]
+        rows = table[block_start + 1:block_end]
+        day_col, pair_col, time_col, group_cols = find_columns(header, rows)
+        selected = [col for col in group_cols if normalize_group_name(header[col]) == target]
+        if not selected:
+            continue
+        columns = [col for col in (day_col, pair_col, time_col) if col is not None] + selected
+        for row in [header] + rows:
+            values = [row[col] if col < len(row) else '' for col in columns]
+            if sliced and values == sliced[0]:
+                continue
+            sliced.append(values)
+    return sliced if len(sliced) > 1 else None
+
+def iter_table_cells(table):
+    """Непустые ячейки таблицы с заголовком колонки и подписью строки
+
+    Подпись строки собирается из колонок дня, пары и времени, день
+    переносится вниз через объединенные ячейки. Выдает кортежи
+    (номер строки, номер колонки, текст, заголовок, подпись строки).
+    """
+    header_index = find_header(table)
+    header = table[header_index] if header_index is not None else []
+    if header_index is not None:
+        day_col, pair_col, time_col, _ = find_columns(header, table[header_index + 1:])
+        label_cols = [col for col in (day_col, pair_col, time_col) if col is not None]
+    else:
+        day_col, label_cols = None, []
+
+    current_day = ''
+    for row_index, row in enumerate(table):
+        if day_col is not None and day_col < len(row) and row[day_col].strip():
+            current_day = row[day_col].strip()
+        label_parts = []
+        for col in label_cols:
+            value = current_day if col == day_col else (row[col].strip() if col < len(row) else '')
+            if value:
+                label_parts.append(value)
+        row_label = ' '.join(label_parts)
+
+        for col_index, text in enumerate(row):
+            text = text.strip()
+            if not text:
+                continue
+            column_header = header[col_index].strip() if col_index < len(header) and row_index != header_index else ''
+            yield row_index, col_index, text, column_header, row_label
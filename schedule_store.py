@@ -0,0 +1,254 @@
+import os
+import json
+import time
+import logging
+import threading
+from database import content_hasher
+
+logger = logging.getLogger(__name__)
+
+STORE_FOLDER = 'schedule_store'
+# Манифесты без поля algorithm записаны с MD5
+HASH_ALGORITHM = 'blake2b-128'
+LEGACY_HASH_ALGORITHM = 'md5'
+
+class ManifestChanges:
+    """Добавленные, измененные и удаленные файлы между двумя манифестами
+
+    Списки содержат относительные пути файлов, buildings - корпуса, в
+    папках которых есть изменения.
+    """
+
+    def __init__(self, old_files, new_files):
+        self.added = sorted(path for path in new_files if path not in old_files)
+        self.changed = sorted(path for path in new_files
+                              if path in old_files and old_files[path]['hash'] != new_files[path]['hash'])
+        self.removed = sorted(path for path in old_files if path not in new_files)
+        buildings = {new_files[path].get('building') for path in self.added + self.changed}
+        buildings.update(old_files[path].get('building') for path in self.removed)
+        self.buildings = sorted(building for building in buildings if building is not None)
+
+    def __bool__(self):
+        return bool(self.added or self.changed or self.removed)
+
+    def __str__(self):
+        return f"добавлено {len(self.added)}, изменено {len(self.changed)}, удалено {len(self.removed)}"
+
+class ScheduleStore:
+    """Хранилище файлов расписания по содержимому
+
+    Каждый файл хранится один раз как blob с именем по хэшу, независимо от
+    числа версий и корпусов, где он встречается. Версия расписания - это
+    манифест, который сопоставляет относительный путь файла с его хэшем,
+    размером и корпусом. Рабочая папка собирается из жестких ссылок на
+    blob'ы, поэтому обновление записывает только новые файлы. Старые версии
+    хранятся, пока их не удалит сборка мусора по числу версий.
+    """
+
+    def __init__(self, root=STORE_FOLDER, keep_versions=10, min_blob_age=3600):
+        self.root = root
+        self.blobs_dir = os.path.join(root, 'blobs')
+        self.manifests_dir = os.path.join(root, 'manifests')
+        self.keep_versions = keep_versions
+        self.min_blob_age = min_blob_age
+        self._lock = threading.Lock()
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        os.makedirs(self.manifests_dir, exist_ok=True)
+
+    @staticmethod
+    def hash_bytes(data):
+        """Хэш содержимого, совпадает с DatabaseManager.get_file_hash"""
+        hasher = content_hasher()
+        hasher.update(data)
+        return hasher.hexdigest()
+
+    def blob_path(self, file_hash):
+        return os.path.join(self.blobs_dir, file_hash[:2], file_hash)
+
+    def has_blob(self, file_hash):
+        return os.path.exists(self.blob_path(file_hash))
+
+    def put_blob(self, data):
+        """Сохранение содержимого, если такого blob'а еще нет, возвращает хэш"""
+        file_hash = self.hash_bytes(data)
+        path = self.blob_path(file_hash)
+        if os.path.exists(path):
+            return file_hash
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        # blob разделяется жесткими ссылками с рабочей папкой и не должен меняться
+        os.chmod(tmp_path, 0o444)
+        os.replace(tmp_path, path)
+        return file_hash
+
+    def read_archive(self, zip_ref, previous, member_path, member_building=None):
+        """Записи манифеста для файлов открытого ZIP архива, возвращает (files, extracted)
+
+        member_path(имя в архиве) - относительный путь файла или None, если
+        файл не нужен, member_building(путь) - корпус файла. Файл, у которого
+        CRC32 и размер из оглавления архива совпадают с записью в previous и
+        blob на месте, не читается: запись берется из previous. Остальные
+        файлы распаковываются в blob'ы, extracted - их число.
+        """
+        files = {}
+        extracted = 0
+        for info in zip_ref.infolist():
+            if info.is_dir():
+                continue
+            relative_path = member_path(info.filename)
+            if relative_path is None:
+                continue
+            known = previous.get(relative_path)
+            if known and known.get('crc') == info.CRC and known['size'] == info.file_size \
+                    and self.has_blob(known['hash']):
+                files[relative_path] = known
+                continue
+
+            file_hash = self.put_blob(zip_ref.read(info))
+            extracted += 1
+            files[relative_path] = {'hash': file_hash, 'size': info.file_size, 'crc': info.CRC,
+                                    'building': member_building(relative_path) if member_building else None}
+        return files, extracted
+
+    def folder_hashes(self, folder, version=None):
+        """Хэши файлов, лежащих прямо в папке folder, по имени файла"""
+        prefix = folder.strip('/') + '/' if folder else ''
+        hashes = {}
+        for relative_path, entry in self.load_manifest(version)['files'].items():
+            if relative_path.startswith(prefix) and '/' not in relative_path[len(prefix):]:
+                hashes[relative_path[len(prefix):]] = entry['hash']
+        return hashes
+
+    def manifest_path(self, version):
+        return os.path.join(self.manifests_dir, f"{version:08d}.json")
+
+    def versions(self):
+        """Номера сохраненных версий по возрастанию"""
+        versions = []
+        for name in os.listdir(self.manifests_dir):
+            stem, extension = os.path.splitext(name)
+            if extension == '.json' and stem.isdigit():
+                versions.append(int(stem))
+        return sorted(versions)
+
+    def load_manifest(self, version=None):
+        """Манифест версии, по умолчанию последней; пустой, если версий нет"""
+        if version is None:
+            versions = self.versions()
+            if not versions:
+                return {'version': 0, 'created_at': None, 'algorithm': HASH_ALGORITHM, 'files': {}}
+            version = versions[-1]
+        with open(self.manifest_path(version), encoding='utf-8') as f:
+            manifest = json.load(f)
+        manifest.setdefault('algorithm', LEGACY_HASH_ALGORITHM)
+        return manifest
+
+    def save_manifest(self, files):
+        """Сохранение новой версии, если набор файлов изменился, возвращает номер версии"""
+        with self._lock:
+            current = self.load_manifest()
+            if current['files'] == files and current['version'] and current['algorithm'] == HASH_ALGORITHM:
+                return current['version']
+
+            version = current['version'] + 1
+            manifest = {'version': version, 'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                        'algorithm': HASH_ALGORITHM, 'files': files}
+            tmp_path = self.manifest_path(version) + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.manifest_path(version))
+            logger.info(f"Сохранена версия расписания {version}: {len(files)} файлов")
+            return version
+
+    def upgrade_hashes(self):
+        """Перевод последней версии на текущий алгоритм хэширования
+
+        Blob'ы версии перехэшируются и сохраняются под новыми именами,
+        манифест сохраняется новой версией. Возвращает словарь старый хэш ->
+        новый хэш, пустой, если переводить нечего.
+        """
+        manifest = self.load_manifest()
+        if manifest['algorithm'] == HASH_ALGORITHM or not manifest['files']:
+            return {}
+
+        mapping = {}
+        files = {}
+        for relative_path, entry in manifest['files'].items():
+            old_hash = entry['hash']
+            if old_hash not in mapping:
+                with open(self.blob_path(old_hash), 'rb') as f:
+                    mapping[old_hash] = self.put_blob(f.read())
+            files[relative_path] = dict(entry, hash=mapping[old_hash])
+        self.save_manifest(files)
+        logger.info(f"Хэши {len(mapping)} файлов расписания переведены на {HASH_ALGORITHM}")
+        return mapping
+
+    def link_blob(self, file_hash, dest):
+        """Атомарная замена файла dest жесткой ссылкой на blob"""
+        blob = self.blob_path(file_hash)
+        if os.path.exists(dest) and os.path.samefile(dest, blob):
+            return False
+
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp_path = dest + '.tmp'
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            os.link(blob, tmp_path)
+        except OSError:
+            with open(blob, 'rb') as src, open(tmp_path, 'wb') as dst:
+                dst.write(src.read())
+        os.replace(tmp_path, dest)
+        return True
+
+    def materialize(self, target, version=None):
+        """Приведение папки target к содержимому версии
+
+        Перезаписываются только файлы с другим содержимым, лишние файлы и
+        пустые папки удаляются. Возвращает число записанных и удаленных
+        файлов.
+        """
+        files = self.load_manifest(version)['files']
+        written = 0
+        for relative_path, entry in files.items():
+            if self.link_blob(entry['hash'], os.path.join(target, *relative_path.split('/'))):
+                written += 1
+
+        removed = 0
+        for root, dirs, filenames in os.walk(target, topdown=False):
+            for filename in filenames:
+                path = os.path.join(root, filename)
+                relative_path = os.path.relpath(path, target).replace(os.sep, '/')
+                if relative_path not in files:
+                    os.remove(path)
+                    removed += 1
+            if root != target and not os.listdir(root):
+                os.rmdir(root)
+        return written, removed
+
+    def collect_garbage(self):
+        """Удаление старых версий и blob'ов, на которые они одни ссылались"""
+        with self._lock:
+            versions = self.versions()
+            for version in versions[:-self.keep_versions]:
+                os.remove(self.manifest_path(version))
+
+            referenced = set()
+            for version in versions[-self.keep_versions:]:
+                referenced.update(entry['hash'] for entry in self.load_manifest(version)['files'].values())
+
+            removed = 0
+            now = time.time()
+            for root, _, filenames in os.walk(self.blobs_dir):
+                for filename in filenames:
+                    path = os.path.join(root, filename)
+                    if filename in referenced or now - os.path.getmtime(path) < self.min_blob_age:
+                        continue
+                    os.remove(path)
+                    removed += 1
+            if removed:
+                logger.info(f"Удалено {removed} неиспользуемых файлов из хранилища расписания")
+            return removed
@@ -0,0 +1,57 @@
+from datetime import timedelta
+from schedule_parser import DAY_NAMES
+
+def entries_for_date(entries, date):
+    """Занятия на дату: по точной дате, а если ее нет в расписании - по дню недели"""
+    date_key = date.strftime('%d.%m')
+    dated = [entry for entry in entries if entry['lesson_date'] == date_key]
+    if dated:
+        return dated
+    return [entry for entry in entries
+            if entry['lesson_date'] is None and entry['day_index'] == date.weekday()]
+
+def unique_lessons(entries):
+    """Занятия без повторов из объединенных ячеек и одинаковых файлов"""
+    seen = set()
+    lessons = []
+    for entry in sorted(entries, key=lambda e: (e['pair_number'] is None, e['pair_number'] or 0, e['time'] or '')):
+        key = (entry['pair_number'], entry['time'], entry['raw_text'])
+        if key in seen:
+            continue
+        seen.add(key)
+        lessons.append(entry)
+    return lessons
+
+def format_lesson(entry):
+    parts = []
+    if entry['pair_number'] is not None:
+        parts.append(f"{entry['pair_number']}.")
+    if entry['time']:
+        parts.append(entry['time'])
+    parts.append(entry['subject'] or entry['raw_text'])
+    details = ', '.join(value for value in (entry['teacher'], entry['room']) if value)
+    line = ' '.join(parts)
+    return f"{line} — {details}" if details else line
+
+def format_day(entries, date, group_name=None):
+    """Текст расписания группы на один день"""
+    title = f"{DAY_NAMES[date.weekday()]}, {date.strftime('%d.%m')}"
+    if group_name:
+        title = f"{group_name} — {title}"
+    lessons = unique_lessons(entries_for_date(entries, date))
+    if not lessons:
+        return f"📅 {title}\nЗанятий нет"
+    return f"📅 {title}\n" + '\n'.join(format_lesson(entry) for entry in lessons)
+
+def week_dates(date):
+    """Даты учебной недели с понедельника по субботу, с воскресенья - следующей"""
+    if date.weekday() == 6:
+        date += timedelta(days=1)
+    monday = date - timedelta(days=date.weekday())
+    return [monday + timedelta(days=offset) for offset in range(6)]
+
+def format_week(entries, date, group_name=None):
+    """Текст расписания группы на учебную неделю"""
+    days = [format_day(entries, day) for day in week_dates(date)]
+    header = f"🗓 {group_name}\n\n" if group_name else ''
+    return header + '\n\n'.join(days)
@@ -0,0 +1,47 @@
+import os
+import sys
+import json
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN_SCRIPT = os.path.join(ROOT, 'main.py')
+
+# Бот запущен как python main.py: процессы пула получают этот путь как главный скрипт
+WORKER_PROBE = f'''
+import sys
+import json
+sys.path.insert(0, {ROOT!r})
+sys.modules['__main__'].__file__ = {MAIN_SCRIPT!r}
+from font_registry import font_registry
+from image_processor import create_render_pool
+
+modules = "__import__('sys').modules"
+probe = f"[getattr({{modules}}.get('__mp_main__'), '__file__', None), sorted({{modules}})]"
+pool = create_render_pool(1, font_registry.export_state())
+try:
+    main_file, modules = pool.submit(eval, probe).result(timeout=60)
+finally:
+    pool.shutdown()
+print(json.dumps({{'main_file': main_file, 'modules': modules}}))
+'''
+
+def test_render_worker_has_no_bot_side_effects(tmp_path):
+    result = subprocess.run([sys.executable, '-c', WORKER_PROBE], cwd=tmp_path,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    worker = json.loads(result.stdout.strip().splitlines()[-1])
+
+    assert os.path.samefile(worker['main_file'], MAIN_SCRIPT)
+    for module in ('schedule_bot', 'database', 'render_cache', 'telebot'):
+        assert module not in worker['modules']
+    assert os.listdir(tmp_path) == []
+
+def test_main_script_import_is_inert(tmp_path):
+    code = (f"import sys, runpy; sys.path.insert(0, {ROOT!r}); "
+            f"runpy.run_path({MAIN_SCRIPT!r}, run_name='__mp_main__'); "
+            "print('schedule_bot' in sys.modules)")
+    result = subprocess.run([sys.executable, '-c', code], cwd=tmp_path,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == 'False'
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,34 @@
+from datetime import date
+
+from schedule_parser import parse_table
+from schedule_text import entries_for_date
+
+HEADER = ['День', 'Пара', 'Время', 'ИС-21', 'ТМ-21/1']
+
+def lessons_by_day(entries):
+    return {(entry['day'], entry['lesson_date']) for entry in entries}
+
+def test_new_day_without_date_drops_previous_date():
+    table = [
+        HEADER,
+        ['Понедельник 02.09', '1', '8:30', 'Математика Иванов 101', 'Физика Петров 202'],
+        ['', '2', '10:10', 'История Сидорова 103', ''],
+        ['Вторник', '1', '8:30', 'Химия Орлова 104', 'Литература Белова 105'],
+    ]
+    entries = parse_table(table)
+
+    assert lessons_by_day(entries) == {('Понедельник', '02.09'), ('Вторник', None)}
+    tuesday = entries_for_date(entries, date(2024, 9, 3))
+    assert {entry['raw_text'] for entry in tuesday} == {'Химия Орлова 104', 'Литература Белова 105'}
+    assert all(entry['day'] == 'Понедельник' for entry in entries_for_date(entries, date(2024, 9, 2)))
+
+def test_repeated_day_label_keeps_date():
+    table = [
+        HEADER,
+        ['Среда 04.09', '1', '8:30', 'Математика Иванов 101', ''],
+        ['Среда', '2', '10:10', 'История Сидорова 103', ''],
+        ['Четверг 05.09', '1', '8:30', 'Химия Орлова 104', ''],
+    ]
+    entries = parse_table(table)
+
+    assert lessons_by_day(entries) == {('Среда', '04.09'), ('Четверг', '05.09')}
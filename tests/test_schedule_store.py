@@ -0,0 +1,87 @@
+import io
+import os
+import zipfile
+
+from schedule_store import ScheduleStore, ManifestChanges
+
+class CountingZipFile(zipfile.ZipFile):
+    """ZipFile, который запоминает, какие файлы были прочитаны"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.read_names = []
+
+    def read(self, name, pwd=None):
+        self.read_names.append(getattr(name, 'filename', name))
+        return super().read(name, pwd)
+
+def make_archive(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+        for name, data in members.items():
+            zip_ref.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+def member_path(name):
+    return name.split('/', 1)[1] if name.startswith('Расписание/') else None
+
+def member_building(path):
+    return 1 if path.startswith('корпус 1/') else None
+
+def read_archive(store, members, previous):
+    with CountingZipFile(make_archive(members)) as zip_ref:
+        files, extracted = store.read_archive(zip_ref, previous, member_path, member_building)
+    return files, extracted, zip_ref.read_names
+
+MEMBERS = {
+    'Расписание/корпус 1/пн.docx': b'monday',
+    'Расписание/корпус 1/вт.docx': b'tuesday',
+    'Расписание/readme.txt': b'notes',
+    'other/skip.txt': b'outside',
+}
+
+def test_first_import_reads_every_member(tmp_path):
+    store = ScheduleStore(str(tmp_path))
+    files, extracted, read_names = read_archive(store, MEMBERS, {})
+
+    assert extracted == 3
+    assert sorted(read_names) == sorted(name for name in MEMBERS if name.startswith('Расписание/'))
+    assert files['корпус 1/пн.docx']['building'] == 1
+    assert files['readme.txt']['building'] is None
+    assert files['корпус 1/пн.docx']['hash'] == ScheduleStore.hash_bytes(b'monday')
+
+def test_unchanged_members_are_not_read(tmp_path):
+    store = ScheduleStore(str(tmp_path))
+    previous, _, _ = read_archive(store, MEMBERS, {})
+
+    changed = dict(MEMBERS)
+    changed['Расписание/корпус 1/вт.docx'] = b'tuesday, room changed'
+    files, extracted, read_names = read_archive(store, changed, previous)
+
+    assert extracted == 1
+    assert read_names == ['Расписание/корпус 1/вт.docx']
+    assert files['корпус 1/пн.docx'] == previous['корпус 1/пн.docx']
+    changes = ManifestChanges(previous, files)
+    assert changes.changed == ['корпус 1/вт.docx'] and changes.buildings == [1]
+
+def test_repacked_identical_archive_has_no_changes(tmp_path):
+    store = ScheduleStore(str(tmp_path))
+    previous, _, _ = read_archive(store, MEMBERS, {})
+    repacked = dict(reversed(list(MEMBERS.items())))
+    files, extracted, read_names = read_archive(store, repacked, previous)
+
+    assert extracted == 0 and read_names == []
+    assert not ManifestChanges(previous, files)
+
+def test_missing_blob_is_extracted_again(tmp_path):
+    store = ScheduleStore(str(tmp_path))
+    previous, _, _ = read_archive(store, MEMBERS, {})
+    blob = store.blob_path(previous['readme.txt']['hash'])
+    os.chmod(blob, 0o644)
+    os.remove(blob)
+
+    files, extracted, read_names = read_archive(store, MEMBERS, previous)
+
+    assert extracted == 1 and read_names == ['Расписание/readme.txt']
+    assert store.has_blob(files['readme.txt']['hash'])
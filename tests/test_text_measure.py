@@ -0,0 +1,60 @@
+import random
+
+import pytest
+
+from font_registry import font_registry
+from text_measure import TextMeasurer
+
+LATIN = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+CYRILLIC = 'абвгдежзийклмнопрстуфхцчшщъыьэюяАБВГДЕЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ'
+MIXED = LATIN + CYRILLIC + '0123456789-.,()/:'
+
+def greedy_wrap(text, font, max_width):
+    """Перенос прежним циклом: слово остается, пока getbbox строки с пробелом меньше ширины"""
+    lines = []
+    current_line = ""
+    for word in text.split():
+        test_line = current_line + word + " "
+        bbox = font.getbbox(test_line)
+        if bbox[2] - bbox[0] < max_width:
+            current_line = test_line
+        else:
+            if current_line:
+                lines.append(current_line.strip())
+            current_line = word + " "
+    if current_line:
+        lines.append(current_line.strip())
+    return lines
+
+def random_cell(rng, alphabet):
+    return " ".join("".join(rng.choice(alphabet) for _ in range(rng.randint(1, 10)))
+                    for _ in range(rng.randint(1, 12)))
+
+@pytest.fixture(params=[10, 14])
+def font(request):
+    return font_registry.get_font(request.param)
+
+def test_text_width_matches_getbbox(font):
+    measurer = TextMeasurer()
+    rng = random.Random(4)
+    for _ in range(2000):
+        text = random_cell(rng, MIXED)
+        bbox = font.getbbox(text)
+        assert measurer.text_width(text, font) == bbox[2] - bbox[0], text
+
+@pytest.mark.parametrize('alphabet', [MIXED, CYRILLIC])
+def test_wrap_cells_matches_greedy_loop(font, alphabet):
+    measurer = TextMeasurer()
+    rng = random.Random(6)
+    for _ in range(40):
+        max_width = rng.randint(30, 250)
+        cells = [random_cell(rng, alphabet) for _ in range(50)]
+        wrapped = measurer.wrap_cells(cells, font, max_width)
+        for cell, lines in zip(cells, wrapped):
+            assert lines == greedy_wrap(cell, font, max_width), (cell, max_width)
+
+def test_wrap_cells_boundary_uses_getbbox(font):
+    cell = 'Т ЖчсгЖо с хБПОФщЖъУ'
+    measurer = TextMeasurer()
+    for max_width in range(100, 200):
+        assert measurer.wrap_cells([cell], font, max_width)[0] == greedy_wrap(cell, font, max_width)
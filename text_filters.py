@@ -0,0 +1,105 @@
+import os
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+SKIP_PATTERNS_FILE = os.environ.get(
+    'SKIP_PATTERNS_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'skip_patterns.txt')
+)
+
+DEFAULT_SKIP_PATTERNS = [
+    r'УТВЕРЖДАЮ',
+    r'Заместитель директора',
+    r'Зам. директора по УМР',
+    r'Заведующая отделением',
+    r'Диспетчер __________________Миронова Е.В',
+    r'Расписание на сайте',
+    r'«\d+»\s+\w+\s+\d{4}\s+года',
+    r'\d{1,2}\s+\w+\s+\d{4}\s+года',
+    r'Четверг.*неделя',
+    r'Понедельник.*неделя',
+    r'Вторник.*неделя',
+    r'Среда.*неделя',
+    r'Пятница.*неделя',
+    r'Суббота.*неделя'
+]
+
+TIME_PATTERN = re.compile(r'\b\d{1,2}[:.\-]\d{2}\b')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+def load_skip_patterns(patterns_file):
+    """Дополнительные шаблоны заголовков из файла, по одному регулярному выражению в строке"""
+    patterns = []
+    if not patterns_file or not os.path.exists(patterns_file):
+        return patterns
+    try:
+        with open(patterns_file, encoding='utf-8') as f:
+            for line in f:
+                pattern = line.strip()
+                if not pattern or pattern.startswith('#'):
+                    continue
+                try:
+                    re.compile(pattern)
+                    patterns.append(pattern)
+                except re.error as e:
+                    logger.error(f"Некорректный шаблон {pattern!r} в {patterns_file}: {e}")
+    except Exception as e:
+        logger.error(f"Ошибка чтения шаблонов из {patterns_file}: {e}")
+    return patterns
+
+def normalize_whitespace(text):
+    """Схлопывание пробельных символов в один пробел"""
+    return WHITESPACE_PATTERN.sub(' ', text.strip())
+
+def collapse_times(text):
+    """Оставляет только первое и последнее время в строке"""
+    matches = list(TIME_PATTERN.finditer(text))
+    if len(matches) <= 2:
+        return text
+
+    first_time = matches[0].group()
+    last_time = matches[-1].group()
+    parts = []
+    position = 0
+    for match in matches:
+        time_str = match.group()
+        if time_str != first_time and time_str != last_time:
+            parts.append(text[position:match.start()])
+            position = match.end()
+    parts.append(text[position:])
+    return WHITESPACE_PATTERN.sub(' ', ''.join(parts)).strip()
+
+class TextFilter:
+    """Фильтр служебного текста расписания
+
+    Все шаблоны заголовков объединены в одно скомпилированное выражение,
+    так что каждый абзац проверяется одним поиском.
+    """
+
+    def __init__(self, patterns=None, patterns_file=SKIP_PATTERNS_FILE):
+        self.patterns_file = patterns_file
+        self.base_patterns = list(DEFAULT_SKIP_PATTERNS if patterns is None else patterns)
+        self.reload()
+
+    def reload(self):
+        """Перечитывание дополнительных шаблонов из файла"""
+        self.patterns = self.base_patterns + load_skip_patterns(self.patterns_file)
+        if self.patterns:
+            self.skip_regex = re.compile('|'.join(f'(?:{pattern})' for pattern in self.patterns), re.IGNORECASE)
+        else:
+            self.skip_regex = None
+
+    def should_skip(self, text):
+        """Является ли строка служебным заголовком"""
+        return self.skip_regex is not None and self.skip_regex.search(text) is not None
+
+    def filter_paragraph(self, text):
+        """Обработанный текст абзаца или None, если абзац не нужен"""
+        text = text.strip()
+        if not text or self.should_skip(text):
+            return None
+        return collapse_times(text)
+
+text_filter = TextFilter()
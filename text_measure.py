@@ -0,0 +1,123 @@
+import threading
+import logging
+from bisect import bisect_left
+from itertools import accumulate
+
+logger = logging.getLogger(__name__)
+
+class TextMeasurer:
+    """Измерение текста с кэшем ширин строк и глифов по шрифтам
+
+    Ширина строки берётся из font.getbbox, как при прямом измерении, и
+    запоминается для каждой строки, поэтому повторяющиеся слова и ячейки
+    измеряются один раз. Сумма продвижений глифов с рамкой не совпадает:
+    она не учитывает кернинг и боковые отступы крайних глифов. Поэтому
+    ширины продвижения глифов, которые тоже запоминаются по одному разу,
+    служат только для оценки границы строки при переносе.
+    """
+
+    MAX_CACHED_WORDS = 50000
+
+    def __init__(self):
+        self._widths = {}
+        self._glyphs = {}
+        self._heights = {}
+        self._lock = threading.Lock()
+
+    def _font_cache(self, caches, font):
+        cache = caches.get(font)
+        if cache is None:
+            with self._lock:
+                cache = caches.setdefault(font, {})
+        return cache
+
+    @staticmethod
+    def _remember(cache, text, width):
+        if len(cache) >= TextMeasurer.MAX_CACHED_WORDS:
+            cache.clear()
+        cache[text] = width
+
+    def text_width(self, text, font):
+        """Ширина строки в пикселях, совпадает с font.getbbox"""
+        cache = self._font_cache(self._widths, font)
+        width = cache.get(text)
+        if width is None:
+            try:
+                bbox = font.getbbox(text)
+                width = bbox[2] - bbox[0]
+            except Exception:
+                width = int(round(self.advance_width(text, font)))
+            self._remember(cache, text, width)
+        return width
+
+    def _measure_glyph(self, font, char):
+        try:
+            return font.getlength(char)
+        except Exception:
+            return 6
+
+    def advance_width(self, text, font):
+        """Сумма ширин продвижения глифов строки без округления"""
+        glyphs = self._font_cache(self._glyphs, font)
+        width = 0
+        for char in text:
+            advance = glyphs.get(char)
+            if advance is None:
+                advance = self._measure_glyph(font, char)
+                glyphs[char] = advance
+            width += advance
+        return width
+
+    def line_height(self, font):
+        """Высота строки шрифта"""
+        height = self._heights.get(font)
+        if height is None:
+            try:
+                ascent, descent = font.getmetrics()
+                height = ascent + descent
+            except Exception:
+                height = 12
+            self._heights[font] = height
+        return height
+
+    def text_dimensions(self, text, font):
+        """Ширина и высота строки"""
+        return self.text_width(text, font), self.line_height(font)
+
+    def wrap_cells(self, cells, font, max_width):
+        """Жадный перенос по словам сразу для набора ячеек одной колонки
+
+        Слово остается в строке, пока ширина строки с завершающим пробелом
+        по text_width меньше max_width, как при последовательном добавлении
+        слов. Ширины продвижения слов с пробелом складываются в общий массив
+        накопленных сумм по всей колонке, бинарный поиск по нему дает
+        кандидата на границу строки, а сама граница проверяется text_width:
+        сумма продвижений и getbbox расходятся на пиксель-другой у края
+        колонки.
+        """
+        words = []
+        bounds = []
+        for cell in cells:
+            start = len(words)
+            words.extend(cell.split())
+            bounds.append((start, len(words)))
+
+        prefix = list(accumulate((self.advance_width(word + " ", font) for word in words), initial=0))
+
+        def fits(i, j):
+            return self.text_width(" ".join(words[i:j]) + " ", font) < max_width
+
+        wrapped = []
+        for start, end in bounds:
+            lines = []
+            i = start
+            while i < end:
+                j = max(bisect_left(prefix, prefix[i] + max_width, i + 1, end + 1) - 1, i + 1)
+                while j > i + 1 and not fits(i, j):
+                    j -= 1
+                while j < end and fits(i, j + 1):
+                    j += 1
+                lines.append(" ".join(words[i:j]))
+                i = j
+            wrapped.append(lines)
+        return wrapped
@@ -0,0 +1,50 @@
+import logging
+from lxml import etree
+from docx_stream import release
+
+logger = logging.getLogger(__name__)
+
+TABLE_TAGS = ('table', 'Table')
+ROW_TAGS = ('row', 'tr')
+CELL_TAGS = ('cell', 'td')
+
+def read_xml_tables(xml_path):
+    """Однопроходное чтение таблиц XML расписания
+
+    Каждая строка относится только к ближайшей охватывающей таблице, а
+    ячейка - к ближайшей строке, поэтому вложенные таблицы не дублируют
+    строки внешней. Таблицы возвращаются в порядке их начала в документе,
+    как списки строк с исходным текстом ячеек. Обработанные элементы
+    освобождаются сразу после чтения.
+    """
+    tables = []
+    open_tables = []
+    open_rows = []
+
+    for event, element in etree.iterparse(xml_path, events=('start', 'end'),
+                                          tag=TABLE_TAGS + ROW_TAGS + CELL_TAGS, huge_tree=True):
+        tag = element.tag
+        if event == 'start':
+            if tag in TABLE_TAGS:
+                tables.append(None)
+                open_tables.append((len(tables) - 1, []))
+            elif tag in ROW_TAGS and open_tables:
+                open_rows.append((len(open_tables), []))
+            continue
+
+        if tag in CELL_TAGS:
+            if open_rows:
+                open_rows[-1][1].append(element.text or '')
+                release(element)
+        elif tag in ROW_TAGS:
+            if open_rows and open_rows[-1][0] == len(open_tables):
+                _, row = open_rows.pop()
+                if row:
+                    open_tables[-1][1].append(row)
+                release(element)
+        elif tag in TABLE_TAGS:
+            index, rows = open_tables.pop()
+            tables[index] = rows
+            release(element)
+
+    return [rows for rows in tables if rows]